@@ -0,0 +1,77 @@
+"""
+Замер памяти индекса подписок на графе с миллионами связей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.follow_graph --users 200000 --edges 3000000
+"""
+import argparse
+import pickle
+import random
+import sys
+from collections import defaultdict
+
+from benchmarks.utils import setup_django, timeit
+
+setup_django()
+
+from posts import follow_graph  # noqa: E402
+
+
+def build_graph(users, edges, seed=0):
+    """Генерирует граф, в котором популярные авторы собирают больше связей."""
+    rnd = random.Random(seed)
+    following = defaultdict(list)
+    followers = defaultdict(list)
+    for _ in range(edges):
+        user = rnd.randrange(1, users + 1)
+        author = int(rnd.paretovariate(1.2)) % users + 1
+        following[user].append(author)
+        followers[author].append(user)
+    return following, followers
+
+
+def size_of_sets(adjacency):
+    total = 0
+    for ids in adjacency.values():
+        packed = set(ids)
+        total += sys.getsizeof(packed)
+        total += sum(sys.getsizeof(i) for i in packed if i > 256)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--edges', type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    following, followers = build_graph(args.users, args.edges)
+    packed = {
+        'following': {k: follow_graph.pack(v) for k, v in following.items()},
+        'followers': {k: follow_graph.pack(v) for k, v in followers.items()},
+    }
+    print(f'users={args.users} edges={args.edges}')
+    for name, adjacency in (('following', following),
+                            ('followers', followers)):
+        arrays = packed[name].values()
+        in_memory = sum(sys.getsizeof(ids) for ids in arrays)
+        pickled = sum(len(pickle.dumps(ids, -1)) for ids in arrays)
+        print(
+            f'{name:9} array(I): {in_memory / 2 ** 20:8.1f} MiB, '
+            f'в кэше: {pickled / 2 ** 20:8.1f} MiB, '
+            f'set(int): {size_of_sets(adjacency) / 2 ** 20:8.1f} MiB'
+        )
+
+    biggest = max(packed['followers'].values(), key=len)
+    probes = [random.randrange(1, args.users + 1) for _ in range(100_000)]
+    elapsed = timeit(
+        lambda: [follow_graph.contains(biggest, p) for p in probes]
+    )
+    print(
+        f'contains() на массиве из {len(biggest)} id: '
+        f'{elapsed / len(probes) * 1e9:.0f} нс'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Замер стоимости проверки лимита запросов.
+
+Сравнивает время представления без лимита и с декоратором rate_limit
+на настроенном кэше; лимиты подняты, чтобы запросы не отклонялись.
+
+Запуск из корня репозитория:
+    python -m benchmarks.ratelimit --repeat 20000
+"""
+import argparse
+
+from benchmarks.utils import setup_django, timeit
+
+setup_django()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from core import ratelimit  # noqa: E402
+from core.decorators import rate_limit  # noqa: E402
+
+
+class User(AnonymousUser):
+    """Пользователь без базы: лимит смотрит только на pk."""
+
+    pk = 1
+
+    @property
+    def is_authenticated(self):
+        return True
+
+
+def view(request):
+    return HttpResponse()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20_000)
+    args = parser.parse_args()
+
+    limits = {'bench': {'user': (10 ** 9, 1), 'ip': (10 ** 9, 1)}}
+    request = RequestFactory().post('/')
+    request.user = User()
+    limited = rate_limit('bench')(view)
+    with override_settings(RATE_LIMITS=limits):
+        keys = ratelimit.bucket_keys('bench', request)
+        plain = timeit(lambda: view(request), args.repeat)
+        wrapped = timeit(lambda: limited(request), args.repeat)
+        consume = timeit(lambda: ratelimit.consume(keys), args.repeat)
+    print(f'представление без лимита: {plain * 1e6:7.2f} мкс')
+    print(f'с rate_limit:             {wrapped * 1e6:7.2f} мкс')
+    print(f'из них consume():         {consume * 1e6:7.2f} мкс')
+    print(f'накладные расходы:        {(wrapped - plain) * 1e6:7.2f} мкс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Пропускная способность SQLite при параллельных чтении и записи.
+
+Сравнивает настройки SQLite по умолчанию с набором SQLITE_PRAGMAS.
+Запуск из корня репозитория:
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 4
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from core.decorators import is_busy_error  # noqa: E402
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'text TEXT NOT NULL, pub_date REAL NOT NULL, author_id INTEGER)',
+    'CREATE INDEX post_date ON post (pub_date)',
+)
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def reader(path, pragmas, stop, stats):
+    conn = connect(path, pragmas)
+    while not stop.is_set():
+        conn.execute(
+            'SELECT id, text FROM post ORDER BY pub_date DESC LIMIT 10'
+        ).fetchall()
+        stats['reads'] += 1
+
+
+def writer(path, pragmas, stop, stats):
+    conn = connect(path, pragmas)
+    while not stop.is_set():
+        try:
+            conn.execute('BEGIN')
+            conn.execute(
+                'INSERT INTO post (text, pub_date, author_id) '
+                'VALUES (?, ?, ?)', ('x' * 200, time.time(), 1)
+            )
+            conn.execute('COMMIT')
+            stats['writes'] += 1
+        except sqlite3.OperationalError as error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            if not is_busy_error(error):
+                raise
+            stats['busy'] += 1
+
+
+def run(pragmas, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        conn = connect(path, pragmas)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.executemany(
+            'INSERT INTO post (text, pub_date, author_id) VALUES (?, ?, ?)',
+            [('x' * 200, i, 1) for i in range(20_000)]
+        )
+        conn.close()
+
+        stop = threading.Event()
+        stats = {'reads': 0, 'writes': 0, 'busy': 0}
+        threads = [
+            threading.Thread(target=reader, args=(path, pragmas, stop, stats))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=writer, args=(path, pragmas, stop, stats))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {key: value / seconds for key, value in stats.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    profiles = (
+        ('по умолчанию', {}),
+        ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+    )
+    for name, pragmas in profiles:
+        result = run(pragmas, args.readers, args.writers, args.seconds)
+        print(
+            f'{name:15} чтений/с: {result["reads"]:9.0f}  '
+            f'записей/с: {result["writes"]:7.0f}  '
+            f'занято/с: {result["busy"]:5.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Сколько байт экономит загрузчик, убирающий отступы.
+
+Рендерит основные страницы на тестовой базе с кэширующим загрузчиком
+поверх обычных и поверх core.template.loaders.Loader и печатает размер
+ответа и экономию по каждой.
+Запуск из корня репозитория:
+    python -m benchmarks.template_whitespace --posts 30
+"""
+import argparse
+
+from benchmarks.utils import setup_django, timeit
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+
+from posts.models import Comment, Group, Post, User  # noqa: E402
+
+SOURCE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+PLAIN_LOADERS = [
+    ('django.template.loaders.cached.Loader', SOURCE_LOADERS),
+]
+STRIPPED_LOADERS = [
+    ('django.template.loaders.cached.Loader', [
+        ('core.template.loaders.Loader', SOURCE_LOADERS),
+    ]),
+]
+
+
+def templates_with(loaders):
+    engine = dict(settings.TEMPLATES[0])
+    engine['OPTIONS'] = {**engine['OPTIONS'], 'loaders': loaders}
+    return [engine]
+
+
+def fill(posts):
+    author = User.objects.create_user(username='bench')
+    group = Group.objects.create(
+        title='Бенчмарк', slug='bench', description='Группа для замеров'
+    )
+    for number in range(posts):
+        post = Post.objects.create(
+            author=author, group=group,
+            text=f'Пост номер {number}\nсо второй строкой',
+        )
+    Comment.objects.create(post=post, author=author, text='Комментарий')
+    return author, group, post
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        author, group, post = fill(args.posts)
+        client = Client()
+        client.force_login(author)
+        pages = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=[group.slug]),
+            'profile': reverse('posts:profile', args=[author.username]),
+            'post_detail': reverse('posts:post_detail', args=[post.id]),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        results = {}
+        for label, loaders in (('обычный', PLAIN_LOADERS),
+                               ('без отступов', STRIPPED_LOADERS)):
+            with override_settings(
+                DEBUG=False, TEMPLATES=templates_with(loaders)
+            ):
+                for name, url in pages.items():
+                    cache.clear()
+                    size = len(client.get(url).content)
+                    seconds = timeit(
+                        lambda: (cache.clear(), client.get(url)), args.repeat
+                    )
+                    results.setdefault(name, {})[label] = (size, seconds)
+        for name, result in results.items():
+            plain, plain_seconds = result['обычный']
+            stripped, seconds = result['без отступов']
+            print(
+                f'{name:13} {plain:7} → {stripped:7} байт '
+                f'(-{(plain - stripped) / plain:5.1%}), '
+                f'рендер {plain_seconds * 1000:6.2f} → '
+                f'{seconds * 1000:6.2f} мс'
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+from django.contrib import admin
+
+from .models import OutboxMessage, Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    # Очередь смотрим в основном ради упавших задач
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'key',)
+    list_filter = ('status', 'name',)
+    search_fields = ('key',)
+    readonly_fields = ('created', 'locked_at', 'last_error',)
+
+
+admin.site.register(Task, TaskAdmin)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'recipients', 'attempts', 'failed',
+                    'send_after',)
+    list_filter = ('failed',)
+    search_fields = ('recipients',)
+    exclude = ('message',)
+    readonly_fields = ('created', 'last_error',)
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
@@ -0,0 +1,62 @@
+"""
+Маршрутизация чтения на реплики.
+
+Разрешение читать с реплики выставляет ``ReplicaMiddleware`` на время
+запроса к представлениям из ``REPLICA_READ_VIEWS``. Реплика
+выбирается одна на весь запрос: у разных реплик разное отставание,
+и выборки одной страницы не должны видеть разные состояния базы.
+Любая запись отмечается, чтобы закрепить пользователя за основной базой.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def reset():
+    """Сбрасывает состояние маршрутизации перед запросом."""
+    _state.replica = None
+    _state.wrote = False
+
+
+def allow_replica_reads(allowed):
+    """Разрешает или запрещает чтение с реплик в текущем потоке."""
+    replicas = settings.DATABASE_REPLICAS
+    _state.replica = random.choice(replicas) if allowed and replicas else None
+
+
+def mark_written():
+    """Отмечает запись в базу в текущем запросе."""
+    _state.wrote = True
+
+
+def has_written():
+    """Была ли запись в базу в текущем запросе."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica and model._meta.app_label in settings.REPLICA_APPS:
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        mark_written()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики — копии основной базы, их не мигрируют
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
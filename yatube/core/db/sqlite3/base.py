@@ -0,0 +1,34 @@
+"""
+SQLite с настройкой PRAGMA при каждом подключении.
+
+Набор PRAGMA передается в ``OPTIONS['pragmas']`` настроек базы
+и применяется в указанном порядке. Режим начала транзакции задает
+атрибут ``transaction_mode`` подключения.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    # None — обычный BEGIN (DEFERRED). 'IMMEDIATE' берет блокировку
+    # записи сразу и ждет ее busy_timeout, а отложенная транзакция
+    # при переходе от чтения к записи в WAL сразу получает SQLITE_BUSY
+    transaction_mode = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,119 @@
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connections,
+                       transaction)
+from django.shortcuts import render
+
+from . import ratelimit
+
+BUSY_ERRORS = ('database is locked', 'database is busy')
+
+
+def is_busy_error(error):
+    """Проверяет, что база занята другим писателем."""
+    return any(message in str(error) for message in BUSY_ERRORS)
+
+
+@contextmanager
+def write_transaction():
+    """
+    Транзакция во всех базах, куда идет запись: основной и шардах.
+
+    Основная база начинает ее с BEGIN IMMEDIATE и ждет писателя
+    busy_timeout. Шарды — обычным BEGIN, чтобы пишущие запросы
+    к разным шардам не ждали друг друга; занятый шард просто
+    дает повтор попытки.
+
+    Отдает список, в который при фиксации добавляется имя базы:
+    первым хуком on_commit, до хуков представления.
+    """
+    committed = []
+    with ExitStack() as stack:
+        for alias in settings.DATABASES:
+            if (alias != DEFAULT_DB_ALIAS
+                    and alias in settings.DATABASE_REPLICAS):
+                continue
+            connection = connections[alias]
+            if alias == DEFAULT_DB_ALIAS:
+                connection.transaction_mode = 'IMMEDIATE'
+            try:
+                stack.enter_context(transaction.atomic(using=alias))
+            finally:
+                connection.transaction_mode = None
+            transaction.on_commit(
+                partial(committed.append, alias), using=alias
+            )
+        yield committed
+
+
+def rewind_files(request):
+    """Возвращает загруженные файлы запроса к началу для новой попытки."""
+    for files in request.FILES.lists():
+        for file in files[1]:
+            file.seek(0)
+
+
+def retry_on_busy(methods=None):
+    """
+    Повторяет пишущее представление, если база занята.
+
+    Если заданы ``methods``, в транзакции записи выполняются только
+    запросы этими методами, остальные (показ формы) идут без нее.
+    Каждая попытка выполняется в отдельной транзакции, поэтому
+    неудачная откатывается целиком, а загруженные файлы перед ней
+    перематываются; файл, сохраненный откаченной попыткой, уберет
+    gc_orphans. Повтор бывает, только пока ничего не зафиксировано:
+    ошибка хука on_commit после коммита не повторяет уже сделанную
+    работу. Пауза между попытками растет экспоненциально
+    со случайной добавкой.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is not None and request.method not in methods:
+                return view(request, *args, **kwargs)
+            attempts = settings.DB_BUSY_RETRIES
+            for attempt in range(attempts):
+                committed = []
+                rewind_files(request)
+                try:
+                    with write_transaction() as committed:
+                        return view(request, *args, **kwargs)
+                except OperationalError as error:
+                    if (committed or not is_busy_error(error)
+                            or attempt == attempts - 1):
+                        raise
+                delay = settings.DB_BUSY_BACKOFF * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay))
+        return wrapper
+    return decorator
+
+
+def rate_limit(scope, methods=None):
+    """
+    Ограничивает частоту запросов к представлению.
+
+    Лимиты области ``scope`` берутся из ``RATE_LIMITS``. Если заданы
+    ``methods``, считаются только запросы этими методами. Сверх лимита
+    отдается 429 с заголовком Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                wait = ratelimit.consume(
+                    ratelimit.bucket_keys(scope, request)
+                )
+                if wait:
+                    response = render(
+                        request, 'core/429.html', {'wait': wait}, status=429
+                    )
+                    response['Retry-After'] = str(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+"""
+Очередь исходящей почты.
+
+``OutboxBackend`` только сохраняет письма в базу, поэтому время ответа
+представления не зависит от почтового сервера. Команда ``send_outbox``
+отправляет накопившееся пачками через одно соединение настоящего
+бэкенда, не чаще ``OUTBOX_RATE`` писем в секунду, и повторяет
+неудачные отправки с растущей паузой. Письма перед отправкой
+забираются условным UPDATE, поэтому параллельные отправители
+не шлют одно письмо дважды.
+"""
+import pickle
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый бэкенд, складывающий письма в очередь."""
+
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            # Соединение не сериализуется, при отправке будет свое
+            message.connection = None
+            rows.append(OutboxMessage(
+                message=pickle.dumps(message),
+                recipients=', '.join(message.recipients()),
+                subject=message.subject[:255],
+            ))
+        OutboxMessage.objects.bulk_create(rows)
+        return len(rows)
+
+
+def claim(limit):
+    """
+    Забирает до ``limit`` готовых к отправке писем.
+
+    Письмо достается тому, чей UPDATE первым сдвинул его время
+    отправки на срок аренды ``OUTBOX_LEASE``: остальные ищут его
+    по прочитанному времени и уже не находят.
+    """
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(
+        failed=False, send_after__lte=now
+    ).values_list('pk', 'send_after')[:limit]
+    lease = now + timedelta(seconds=settings.OUTBOX_LEASE)
+    claimed = [
+        pk for pk, send_after in due
+        if OutboxMessage.objects.filter(
+            pk=pk, send_after=send_after
+        ).update(send_after=lease)
+    ]
+    return list(OutboxMessage.objects.filter(pk__in=claimed))
+
+
+def postpone(row, error):
+    """Откладывает неотправленное письмо или помечает его ошибочным."""
+    row.attempts += 1
+    row.last_error = repr(error)
+    row.failed = row.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    row.send_after = timezone.now() + timedelta(
+        seconds=settings.OUTBOX_RETRY_BACKOFF * 2 ** (row.attempts - 1)
+    )
+    row.save(update_fields=('attempts', 'last_error', 'failed', 'send_after'))
+
+
+def deliver(limit):
+    """Отправляет до ``limit`` писем; возвращает число отправленных."""
+    batch = claim(limit)
+    if not batch:
+        return 0
+    sent = 0
+    interval = 1 / settings.OUTBOX_RATE
+    connection = get_connection(settings.OUTBOX_TRANSPORT)
+    try:
+        connection.open()
+    except Exception as error:
+        # Иначе письма ждали бы конца аренды, не тратя попыток
+        for row in batch:
+            postpone(row, error)
+        return 0
+    with connection:
+        for row in batch:
+            started = time.monotonic()
+            try:
+                connection.send_messages([pickle.loads(row.message)])
+            except Exception as error:
+                postpone(row, error)
+            else:
+                row.delete()
+                sent += 1
+            pause = interval - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+    return sent
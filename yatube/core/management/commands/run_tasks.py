@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.tasks import claim, execute
+
+
+def run(job):
+    try:
+        return execute(job)
+    finally:
+        # У каждого потока свое соединение, не оставляем его открытым
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи фоновой очереди в пуле потоков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS,
+            help='Число потоков.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1,
+            help='Пауза между опросами пустой очереди, сек.'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                jobs = claim(workers * 2)
+                for ok in pool.map(run, jobs):
+                    done += ok
+                    failed += not ok
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
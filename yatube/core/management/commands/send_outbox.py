@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди исходящей почты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=settings.OUTBOX_BATCH,
+            help='Сколько писем отправлять через одно соединение.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд; 0 — разобрать очередь и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            sent = deliver(options['batch'])
+            total += sent
+            if sent:
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Отправлено писем: {total}')
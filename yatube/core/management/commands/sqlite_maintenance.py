@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite: обновление статистики планировщика, '
+        'инкрементальная очистка и сброс WAL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Полный ANALYZE вместо PRAGMA optimize.'
+        )
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=1000,
+            help='Сколько свободных страниц вернуть за запуск, 0 — все.'
+        )
+        parser.add_argument(
+            '--convert-vacuum', action='store_true',
+            help='Включить auto_vacuum=INCREMENTAL на существующей базе '
+                 '(выполняет полный VACUUM).'
+        )
+
+    def handle(self, *args, **options):
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                continue
+            with connection.cursor() as cursor:
+                if options['convert_vacuum']:
+                    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                    cursor.execute('VACUUM')
+                if options['analyze']:
+                    cursor.execute('ANALYZE')
+                cursor.execute('PRAGMA optimize')
+                cursor.execute('PRAGMA freelist_count')
+                free_pages = cursor.fetchone()[0]
+                pages = options['vacuum_pages'] or free_pages
+                cursor.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+                cursor.fetchall()
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                cursor.fetchall()
+            self.stdout.write(
+                f'{alias}: свободных страниц было {free_pages}, '
+                f'очищено до {min(pages, free_pages)}'
+            )
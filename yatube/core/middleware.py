@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .db.routers import allow_replica_reads, has_written, reset
+
+
+class ReplicaMiddleware:
+    """
+    Направляет чтение ленты и постов на реплики.
+
+    После записи пользователь на REPLICA_PIN_SECONDS закрепляется
+    за основной базой через cookie, чтобы видеть свои изменения,
+    пока реплики не догонят.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset()
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        allow_replica_reads(
+            not pinned
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+        )
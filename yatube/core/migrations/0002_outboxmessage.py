@@ -0,0 +1,33 @@
+# Generated by Django 2.2.19 on 2026-10-19 09:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.BinaryField(verbose_name='Письмо (pickle)')),
+                ('recipients', models.TextField(verbose_name='Получатели')),
+                ('subject', models.CharField(max_length=255, verbose_name='Тема')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попытки')),
+                ('send_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Отправить не раньше')),
+                ('failed', models.BooleanField(default=False, verbose_name='Не доставлено')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Исходящее письмо',
+                'verbose_name_plural': 'Исходящие письма',
+                'ordering': ('send_after',),
+            },
+        ),
+    ]
@@ -0,0 +1,99 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенная задача фоновой очереди."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Задача')
+    args = models.TextField(default='[]', verbose_name='Аргументы (JSON)')
+    key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='Ключ',
+        help_text='Одинаковые задачи в очереди с этим ключом не дублируются'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попытки')
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше'
+    )
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Взята в работу'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлена'
+    )
+
+    class Meta:
+        """
+        Добавляет русские названия в админке.
+        """
+        ordering = ('run_at', )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=Q(status='pending'),
+                name='task_pending_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ожидающее отправки."""
+
+    message = models.BinaryField(verbose_name='Письмо (pickle)')
+    recipients = models.TextField(verbose_name='Получатели')
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попытки')
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Отправить не раньше'
+    )
+    failed = models.BooleanField(default=False, verbose_name='Не доставлено')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано'
+    )
+
+    class Meta:
+        """
+        Добавляет русские названия в админке.
+        """
+        ordering = ('send_after', )
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return self.subject
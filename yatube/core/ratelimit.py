@@ -0,0 +1,86 @@
+"""
+Ограничение частоты пишущих запросов.
+
+Для каждого пользователя и IP-адреса в кэше считаются запросы
+в окне фиксированной длины: ключ счетчика включает номер окна,
+счетчик создается ``cache.add`` и растет ``cache.incr``. Обе операции
+атомарны в кэше, поэтому параллельные запросы не могут взять один
+и тот же запрос лимита. Если хотя бы один счетчик превышен, запрос
+отклоняется, а прибавки возвращаются обратно, чтобы отказ не расходовал
+лимит. На границе окон за короткое время может пройти до двух лимитов —
+цена отказа от блокировок и хранения истории.
+
+Это замена ведра токенов, а не оно само. Ведру нужно прочитать остаток
+и записать новый одним действием (compare-and-set), а в API кэша
+Django такого нет. Ведро на get и set пропускало параллельные запросы
+на один и тот же токен.
+
+Счетчики общие для процессов только с общим кэшем
+(``CACHE_IS_SHARED``). Без него у каждого процесса сервера свой кэш
+в памяти, и лимит действует на процесс: при N процессах пройдет
+до N лимитов.
+
+Лимиты задаются в ``RATE_LIMITS``: для области, например ``'post'``,
+указываются число запросов и длина окна в секундах, отдельно
+для пользователя и для IP.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+BUCKET_KEY = 'ratelimit:{}:{}:{}'
+
+
+def bucket_keys(scope, request):
+    """Ключи счетчиков запроса с их лимитами."""
+    limits = settings.RATE_LIMITS[scope]
+    keys = {}
+    if 'user' in limits and request.user.is_authenticated:
+        keys[BUCKET_KEY.format(scope, 'user', request.user.pk)] = (
+            limits['user']
+        )
+    if 'ip' in limits:
+        address = request.META.get('REMOTE_ADDR', '')
+        keys[BUCKET_KEY.format(scope, 'ip', address)] = limits['ip']
+    return keys
+
+
+def _incr(key, period):
+    cache.add(key, 0, period)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснен между add и incr: запрос в окне первый
+        cache.add(key, 1, period)
+        return 1
+
+
+def consume(keys, now=None):
+    """
+    Засчитывает запрос в каждом окне.
+
+    Возвращает 0, если запрос пропущен, иначе — через сколько
+    секунд закончится окно, исчерпанное дольше всех.
+    """
+    if not keys:
+        return 0
+    now = time.time() if now is None else now
+    counted = []
+    wait = 0
+    for key, (limit, period) in keys.items():
+        window = int(now // period)
+        window_key = f'{key}:{window}'
+        counted.append(window_key)
+        if _incr(window_key, period) > limit:
+            wait = max(wait, (window + 1) * period - now)
+    if wait:
+        for window_key in counted:
+            try:
+                cache.decr(window_key)
+            except ValueError:
+                # Счетчик уже вытеснен или истек: возвращать нечего
+                pass
+        return math.ceil(wait)
+    return 0
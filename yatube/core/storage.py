@@ -0,0 +1,54 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+
+# Форматы, которые имеет смысл сжимать; картинки уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.txt', '.map', '.json')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+    ``collectstatic`` кладет рядом с каждым сжимаемым файлом его
+    ``.gz``, поэтому при отдаче ничего не сжимается. Пока статика
+    не собрана (тесты, разработка), ссылки ведут на исходные имена.
+    """
+
+    manifest_strict = False
+
+    @cached_property
+    def hashed_names(self):
+        """Имена файлов с хэшем: их можно кэшировать навсегда."""
+        return frozenset(self.hashed_files.values())
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = {*self.hashed_files, *self.hashed_files.values()}
+        for name in names:
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        gz_name = f'{name}.gz'
+        if (self.exists(gz_name) and os.path.getmtime(self.path(gz_name))
+                >= os.path.getmtime(self.path(name))):
+            return
+        with self.open(name) as original:
+            data = original.read()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            if self.exists(gz_name):
+                self.delete(gz_name)
+            self._save(gz_name, ContentFile(compressed))
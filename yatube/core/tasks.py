@@ -0,0 +1,113 @@
+"""
+Фоновая очередь задач в базе.
+
+Задача — функция, зарегистрированная декоратором ``@task``. Вызов
+``enqueue`` ставит ее в очередь после фиксации транзакции, так что
+откат запроса отменяет и задачу. Задачи с одинаковым ключом, еще
+не взятые в работу, не дублируются. Выполняет их команда ``run_tasks``,
+неудачные попытки повторяются с растущей паузой.
+"""
+import json
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+
+
+def task(func):
+    """Регистрирует функцию как фоновую задачу."""
+    registry[f'{func.__module__}.{func.__name__}'] = func
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    return func
+
+
+def push(name, args=(), key=None, delay=0):
+    """Сразу записывает задачу в очередь."""
+    Task.objects.bulk_create(
+        [Task(
+            name=name,
+            args=json.dumps(list(args)),
+            key=key,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """Ставит задачу в очередь после фиксации текущей транзакции."""
+    transaction.on_commit(
+        lambda: push(func.task_name, args, key=key, delay=delay)
+    )
+
+
+def claim(limit):
+    """
+    Забирает в работу до ``limit`` готовых задач.
+
+    Задача достается тому воркеру, чей UPDATE первым сменил ее
+    состояние. Задачи упавшего воркера возвращаются в оборот
+    по истечении аренды; такой возврат считается попыткой, и после
+    ``TASK_MAX_ATTEMPTS`` задача помечается ошибочной.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.TASK_LEASE)
+    due = Task.objects.filter(
+        Q(status=Task.PENDING, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_at__lt=expired)
+    ).values_list('pk', 'status', 'locked_at', 'attempts')[:limit]
+    claimed = []
+    for pk, status, locked_at, attempts in due:
+        changes = {'status': Task.RUNNING, 'locked_at': now}
+        if status == Task.RUNNING:
+            # Прошлый воркер не дожил до конца задачи
+            changes['attempts'] = attempts = attempts + 1
+            if attempts >= settings.TASK_MAX_ATTEMPTS:
+                changes.update(
+                    status=Task.FAILED, locked_at=None,
+                    last_error='Истек срок аренды',
+                )
+        # Просроченная задача остается RUNNING, поэтому сверяем и
+        # прочитанное время аренды: его меняет первый же захват
+        if Task.objects.filter(
+            pk=pk, status=status, locked_at=locked_at
+        ).update(**changes) and changes['status'] == Task.RUNNING:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def execute(job):
+    """Выполняет задачу; успешную удаляет, неудачную откладывает."""
+    try:
+        registry[job.name](*json.loads(job.args))
+    except Exception as error:
+        job.attempts += 1
+        job.last_error = repr(error)
+        if job.attempts >= settings.TASK_MAX_ATTEMPTS:
+            job.status = Task.FAILED
+        else:
+            delay = settings.TASK_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=delay + random.uniform(0, delay)
+            )
+        try:
+            with transaction.atomic():
+                Task.objects.filter(pk=job.pk).update(
+                    status=job.status, attempts=job.attempts,
+                    last_error=job.last_error, run_at=job.run_at,
+                    locked_at=None,
+                )
+        except IntegrityError:
+            # Пока задача выполнялась, в очередь встал ее дубль
+            Task.objects.filter(pk=job.pk).delete()
+        return False
+    Task.objects.filter(pk=job.pk).delete()
+    return True
@@ -0,0 +1,67 @@
+"""
+Загрузчик шаблонов, убирающий отступы разметки.
+
+Пробелы между строками шаблона схлопываются до одного перевода строки
+один раз, при компиляции. Для браузера перевод строки равен пробелу,
+поэтому вид страницы не меняется. Содержимое ``<pre>`` и ``<textarea>``
+не трогается, а текст из переменных (например, после ``linebreaksbr``)
+появляется уже при выводе и обработке не подвергается. Загрузчик
+ставится внутрь кэширующего, так что во время запроса ничего не делает.
+
+Обрабатываются только страницы ``.html``. Письма — простой текст,
+в котором переводы строк значимы, хотя по обычаю Django шаблон письма
+называется ``*_email.html``; такие шаблоны и ``.txt`` отдаются как есть.
+"""
+import re
+
+from django.template import Origin
+from django.template.loaders.base import Loader as BaseLoader
+
+PRESERVED = re.compile(r'(<(pre|textarea)\b.*?</\2\s*>)', re.S | re.I)
+INDENT = re.compile(r'[ \t]*\n\s*')
+
+
+def is_markup(template_name):
+    """Проверяет, что шаблон — разметка страницы, а не текст письма."""
+    return (template_name.endswith('.html')
+            and not template_name.endswith('_email.html'))
+
+
+def strip_whitespace(source):
+    """Схлопывает отступы вне <pre> и <textarea>."""
+    parts = PRESERVED.split(source)
+    # split возвращает текст, найденный блок и имя тега по очереди
+    result = []
+    for index, part in enumerate(parts):
+        kind = index % 3
+        if kind == 0:
+            result.append(INDENT.sub('\n', part))
+        elif kind == 1:
+            result.append(part)
+    return ''.join(result)
+
+
+class Loader(BaseLoader):
+    """Берет шаблоны у вложенных загрузчиков и убирает отступы."""
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            for origin in loader.get_template_sources(template_name):
+                stripped = Origin(
+                    name=origin.name,
+                    template_name=origin.template_name,
+                    loader=self,
+                )
+                stripped.source_origin = origin
+                yield stripped
+
+    def get_contents(self, origin):
+        source_origin = origin.source_origin
+        contents = source_origin.loader.get_contents(source_origin)
+        if not is_markup(origin.template_name):
+            return contents
+        return strip_whitespace(contents)
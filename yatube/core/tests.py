@@ -0,0 +1,500 @@
+import gzip
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+
+from . import ratelimit, tasks
+from .mail import claim, deliver
+from .template.loaders import strip_whitespace
+from .db.routers import ReplicaRouter, allow_replica_reads, reset
+from .decorators import retry_on_busy
+from .models import OutboxMessage, Task
+
+User = get_user_model()
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+calls = []
+
+
+@tasks.task
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task
+def explode():
+    raise ValueError('boom')
+
+
+class DatabaseProfileTests(TestCase):
+    """Тестирует настройку SQLite и повтор записи."""
+
+    def test_pragmas_applied(self):
+        """Проверка применения PRAGMA при подключении."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    @override_settings(DB_BUSY_RETRIES=3, DB_BUSY_BACKOFF=0)
+    def test_retry_on_busy(self):
+        """Проверка повтора представления при занятой базе."""
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'),
+            HttpResponse('ok'),
+        ])
+        request = RequestFactory().post('/')
+        response = retry_on_busy()(view)(request)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(view.call_count, 2)
+
+        view = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_on_busy()(view)(request)
+        self.assertEqual(view.call_count, 1)
+
+
+class WriteTransactionTests(TransactionTestCase):
+    """Тестирует транзакцию попытки пишущего представления."""
+
+    @override_settings(DB_BUSY_RETRIES=2, DB_BUSY_BACKOFF=0)
+    def test_immediate_begin_and_commit_hooks(self):
+        """Проверка BEGIN IMMEDIATE и отмены хуков неудачной попытки."""
+        done = []
+
+        def view(request):
+            attempt = len(done)
+            done.append(None)
+            transaction.on_commit(lambda: done.__setitem__(attempt, 'ok'))
+            if attempt == 0:
+                raise OperationalError('database is locked')
+            return HttpResponse('ok')
+
+        with CaptureQueriesContext(connection) as queries:
+            retry_on_busy()(view)(RequestFactory().post('/'))
+        self.assertEqual(
+            [query['sql'] for query in queries], ['BEGIN IMMEDIATE'] * 2
+        )
+        self.assertEqual(done, [None, 'ok'])
+
+    @override_settings(DB_BUSY_RETRIES=2, DB_BUSY_BACKOFF=0)
+    def test_commit_hook_error_is_not_retried(self):
+        """Проверка, что ошибка хука после коммита не повторяет запрос."""
+        calls = []
+
+        def push():
+            raise OperationalError('database is locked')
+
+        def view(request):
+            calls.append(request)
+            transaction.on_commit(push)
+            return HttpResponse('ok')
+
+        with self.assertRaises(OperationalError):
+            retry_on_busy()(view)(RequestFactory().post('/'))
+        self.assertEqual(len(calls), 1)
+
+    def test_safe_methods_skip_write_lock(self):
+        """Проверка, что показ формы идет без блокировки записи."""
+        view = retry_on_busy(methods=('POST',))(
+            lambda request: HttpResponse('ok')
+        )
+        with CaptureQueriesContext(connection) as queries:
+            view(RequestFactory().get('/'))
+        self.assertEqual(len(queries), 0)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Тестирует чтение с реплик и закрепление за основной базой."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание пользователей."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='Neo')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.author.delete()
+
+    def tearDown(self):
+        reset()
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_router(self):
+        """Проверка выбора базы для чтения."""
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Post))
+        allow_replica_reads(True)
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertIsNone(router.db_for_read(Session))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica2'])
+    def test_one_replica_per_request(self):
+        """Проверка, что все чтения запроса идут с одной реплики."""
+        router = ReplicaRouter()
+        allow_replica_reads(True)
+        self.assertEqual(
+            len({router.db_for_read(Post) for _ in range(50)}), 1
+        )
+        allow_replica_reads(False)
+        self.assertIsNone(router.db_for_read(Post))
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_write_pins_primary(self):
+        """Проверка cookie закрепления после записи."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:index'))
+        self.assertNotIn('db_primary', response.cookies)
+        response = client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Neo'})
+        )
+        self.assertIn('db_primary', response.cookies)
+
+
+@override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_BACKOFF=0)
+class TaskQueueTests(TestCase):
+    """Тестирует фоновую очередь задач."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_dedup_and_execute(self):
+        """Проверка слияния дублей и удаления выполненной задачи."""
+        tasks.push(remember.task_name, [1], key='same')
+        tasks.push(remember.task_name, [2], key='same')
+        tasks.push(remember.task_name, [3])
+        self.assertEqual(Task.objects.count(), 2)
+        for job in tasks.claim(10):
+            self.assertTrue(tasks.execute(job))
+        self.assertEqual(sorted(calls), [1, 3])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Проверка повтора упавшей задачи и пометки об ошибке."""
+        tasks.push(explode.task_name)
+        job, = tasks.claim(10)
+        self.assertEqual(tasks.claim(10), [])
+        self.assertFalse(tasks.execute(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.PENDING, 1))
+        job, = tasks.claim(10)
+        tasks.execute(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertIn('boom', job.last_error)
+        self.assertEqual(tasks.claim(10), [])
+
+    def test_expired_task_is_reclaimed_once(self):
+        """Проверка, что просроченную задачу забирает один воркер."""
+        tasks.push(remember.task_name, [1])
+        tasks.claim(10)
+        Task.objects.update(
+            locked_at=timezone.now() - timedelta(
+                seconds=settings.TASK_LEASE + 1
+            )
+        )
+        stale = list(
+            Task.objects.values_list(
+                'pk', 'status', 'locked_at', 'attempts'
+            )
+        )
+        self.assertEqual(len(tasks.claim(10)), 1)
+        # Второй воркер прочитал задачу до захвата первым
+        due = mock.MagicMock()
+        due.values_list.return_value.__getitem__.return_value = stale
+        reads = iter([due])
+        real_filter = Task.objects.filter
+        with mock.patch.object(
+            Task.objects, 'filter',
+            side_effect=lambda *args, **kwargs: next(
+                reads, None
+            ) or real_filter(*args, **kwargs)
+        ):
+            self.assertEqual(tasks.claim(10), [])
+
+    @override_settings(TASK_MAX_ATTEMPTS=2)
+    def test_reclaim_counts_as_attempt(self):
+        """Проверка, что задача упавшего воркера не повторяется вечно."""
+        tasks.push(remember.task_name, [1])
+        tasks.claim(10)
+        for expected in (1, 2):
+            Task.objects.update(
+                locked_at=timezone.now() - timedelta(
+                    seconds=settings.TASK_LEASE + 1
+                )
+            )
+            reclaimed = tasks.claim(10)
+            job = Task.objects.get()
+            self.assertEqual(job.attempts, expected)
+        self.assertEqual(reclaimed, [])
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(tasks.claim(10), [])
+        self.assertEqual(calls, [])
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('smtp down')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('no route to smtp')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('соединение не открылось')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_TRANSPORT='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_RATE=1000,
+    OUTBOX_RETRY_BACKOFF=0,
+)
+class OutboxTests(TestCase):
+    """Тестирует очередь исходящей почты."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание пользователя с почтой."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', email='auth@example.com', password='secret-42'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+
+    def test_password_reset_is_queued(self):
+        """Проверка отложенной отправки письма сброса пароля."""
+        response = Client().post(
+            reverse('users:password_reset'), {'email': 'auth@example.com'}
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        self.assertEqual(deliver(10), 1)
+        self.assertEqual(mail.outbox[0].to, ['auth@example.com'])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_claimed_message_is_sent_once(self):
+        """Проверка, что забранное письмо не отправит второй воркер."""
+        mail.send_mail('Тема', 'Текст', None, ['auth@example.com'])
+        row, = claim(10)
+        self.assertEqual(claim(10), [])
+        self.assertEqual(deliver(10), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(OutboxMessage.objects.filter(pk=row.pk).exists())
+
+    @override_settings(
+        OUTBOX_TRANSPORT='core.tests.BrokenBackend', OUTBOX_MAX_ATTEMPTS=2
+    )
+    def test_failed_delivery_is_retried(self):
+        """Проверка повтора и пометки недоставленного письма."""
+        mail.send_mail('Тема', 'Текст', None, ['auth@example.com'])
+        self.assertEqual(deliver(10), 0)
+        row = OutboxMessage.objects.get()
+        self.assertEqual((row.attempts, row.failed), (1, False))
+        deliver(10)
+        row.refresh_from_db()
+        self.assertTrue(row.failed)
+        self.assertEqual(deliver(10), 0)
+
+    @override_settings(OUTBOX_TRANSPORT='core.tests.UnreachableBackend')
+    def test_connection_error_releases_batch(self):
+        """Проверка, что письма не ждут аренды, если сервер недоступен."""
+        mail.send_mail('Тема', 'Текст', None, ['auth@example.com'])
+        self.assertEqual(deliver(10), 0)
+        row = OutboxMessage.objects.get()
+        self.assertEqual((row.attempts, row.failed), (1, False))
+        self.assertIn('no route to smtp', row.last_error)
+        self.assertLess(
+            row.send_after,
+            timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE),
+        )
+        self.assertEqual(len(claim(10)), 1)
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticPipelineTests(TestCase):
+    """Тестирует сборку и отдачу статики."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Сборка статики во временную папку."""
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_hashed_precompressed_asset(self):
+        """Проверка хэша в имени и отдачи сжатой копии."""
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(body.startswith(b'@charset'))
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+
+class WhitespaceLoaderTests(TestCase):
+    """Тестирует загрузчик, убирающий отступы."""
+
+    def test_strip_keeps_preformatted(self):
+        """Проверка сохранения <pre> и <textarea>."""
+        source = (
+            '<div>\n    <p>{{ text|linebreaksbr }}</p>  \n\n  </div>\n'
+            '<pre>\n  a\n    b</pre>\n  <TEXTAREA>\n  x</TEXTAREA>'
+        )
+        self.assertEqual(
+            strip_whitespace(source),
+            '<div>\n<p>{{ text|linebreaksbr }}</p>\n</div>\n'
+            '<pre>\n  a\n    b</pre>\n<TEXTAREA>\n  x</TEXTAREA>'
+        )
+
+    def test_email_keeps_blank_lines(self):
+        """Проверка, что абзацы письма разделены пустыми строками."""
+        body = render_to_string('registration/password_reset_email.html', {
+            'protocol': 'http', 'domain': 'yatube.ru', 'uid': 'MQ',
+            'token': 'set-password', 'site_name': 'Yatube', 'user': User(),
+        })
+        paragraphs = [part for part in body.split('\n\n') if part.strip()]
+        self.assertGreaterEqual(len(paragraphs), 4)
+
+    def test_rendered_page_has_no_indent(self):
+        """Проверка отсутствия отступов в готовой странице."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('\n  ', response.content.decode())
+
+
+@override_settings(RATE_LIMITS={
+    'follow': {'user': (2, 60), 'ip': (3, 60)},
+    'comment': {'user': (1, 60)},
+})
+class RateLimitTests(TestCase):
+    """Тестирует ограничение частоты пишущих запросов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание пользователей."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.author = User.objects.create_user(username='Neo')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.other.delete()
+        cls.author.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.follow = reverse(
+            'posts:profile_follow', kwargs={'username': 'Neo'}
+        )
+
+    def tearDown(self):
+        """Сбрасывает счетчики, чтобы лимиты не задели другие тесты."""
+        cache.clear()
+
+    def test_user_and_ip_buckets(self):
+        """Проверка 429 с Retry-After сверх лимитов."""
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.follow).status_code, 302)
+        response = self.client.get(self.follow)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response['Retry-After']), range(1, 61))
+
+        # Другому пользователю с того же адреса остался один запрос лимита IP
+        other = Client()
+        other.force_login(self.other)
+        self.assertEqual(other.get(self.follow).status_code, 302)
+        self.assertEqual(other.get(self.follow).status_code, 429)
+
+    def test_only_listed_methods_are_counted(self):
+        """Проверка, что GET формы комментария лимит не расходует."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        url = reverse('posts:add_comment', kwargs={'id': post.id})
+        self.client.get(url)
+        self.assertEqual(
+            self.client.post(url, {'text': 'Раз'}).status_code, 302
+        )
+        self.assertEqual(
+            self.client.post(url, {'text': 'Два'}).status_code, 429
+        )
+
+    def test_window_resets(self):
+        """Проверка, что лимит возвращается со следующим окном."""
+        keys = {'ratelimit:test': (2, 10)}
+        self.assertEqual(ratelimit.consume(keys, now=100), 0)
+        self.assertEqual(ratelimit.consume(keys, now=101), 0)
+        self.assertEqual(ratelimit.consume(keys, now=101), 9)
+        self.assertEqual(ratelimit.consume(keys, now=105), 5)
+        self.assertEqual(ratelimit.consume(keys, now=110), 0)
+
+    def test_rejection_survives_evicted_counter(self):
+        """Проверка отказа, когда счетчик вытеснен до возврата прибавки."""
+        keys = {'ratelimit:test': (1, 10)}
+        self.assertEqual(ratelimit.consume(keys, now=100), 0)
+        with mock.patch.object(
+            ratelimit.cache, 'decr', side_effect=ValueError
+        ):
+            self.assertEqual(ratelimit.consume(keys, now=101), 9)
+
+    def test_parallel_requests_do_not_exceed_limit(self):
+        """Проверка, что параллельные запросы не берут лишнего."""
+        keys = {'ratelimit:test': (5, 60)}
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda _: ratelimit.consume(keys, now=120), range(40)
+            ))
+        self.assertEqual(results.count(0), 5)
@@ -1,4 +1,12 @@
+import mimetypes
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
 
 
 def page_not_found(request, exception):
@@ -11,3 +19,37 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html')
+
+
+def serve_static(request, path):
+    """
+    Отдает собранную статику.
+
+    Файлы с хэшем в имени кэшируются навсегда, а если клиент
+    принимает gzip и есть сжатая копия — отдается она.
+    """
+    storage = staticfiles_storage
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or not storage.exists(name):
+        raise Http404(path)
+    content_type, _ = mimetypes.guess_type(name)
+    gz_name = f'{name}.gz'
+    accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if accepts_gzip and storage.exists(gz_name):
+        response = FileResponse(
+            storage.open(gz_name), content_type=content_type
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(storage.open(name), content_type=content_type)
+    if name in storage.hashed_names:
+        response['Cache-Control'] = settings.STATIC_IMMUTABLE_CACHE
+    else:
+        response['Cache-Control'] = settings.STATIC_REVALIDATE_CACHE
+    patch_vary_headers(response, ('Accept-Encoding', ))
+    return response
+
+
+def serve_sitemap(request, path):
+    """Отдает сайтмапы, заранее собранные командой build_sitemaps."""
+    return serve(request, path, document_root=settings.SITEMAP_ROOT)
@@ -1,27 +1,205 @@
-from django.contrib import admin
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.template.response import TemplateResponse
 
+from . import bulk, search
 from .models import Comment, Follow, Group, Post
+from .paginator import PostPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class BoundedPaginator(PostPaginator):
+    """Пагинатор админки, который не считает все записи таблицы."""
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        super().__init__(
+            object_list, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page
+        )
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    # Общее число записей таблицы не считаем, найденные — до предела
+    show_full_result_count = False
+    paginator = BoundedPaginator
+
+
+class FullTextSearchAdmin(ScalableAdmin):
+    # Поиск по тексту идет через индекс FTS5, а не LIKE по таблице
+    search_fields = ('text',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available(queryset):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.matching(queryset, search_term), False
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое берет выбранную запись из строки списка."""
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or {str(v) for v in value} != {str(selected.pk)}:
+            return super().optgroups(name, value, attr)
+        # Запись уже загружена через select_related, запрос не нужен
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        label = self.choices.field.label_from_instance(selected)
+        options.append(self.create_option(
+            name, selected.pk, label, True, len(options)
+        ))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        # Админка оборачивает виджет кнопками «добавить» и «изменить»
+        widget = getattr(widget, 'widget', widget)
+        if self.instance.group_id:
+            widget.selected = self.instance.group
+
+
+class PostActionForm(helpers.ActionForm):
+    # Slug вместо выпадающего списка всех групп
+    group = forms.SlugField(
+        required=False,
+        label='Группа (slug, пусто — без группы)'
+    )
+
+
+class PostAdmin(FullTextSearchAdmin):
     # Перечисляем поля, которые должны отображаться в админке
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
-    # Добавляем интерфейс для поиска по тексту постов
-    search_fields = ('text',)
+    # Автора и группу подтягиваем в том же запросе
+    list_select_related = ('author', 'group',)
+    # Навигация по датам опирается на индекс по pub_date
+    date_hierarchy = 'pub_date'
     # Добавляем возможность фильтрации по дате
     list_filter = ('pub_date',)
     # Добавляем возможность редактировать группу в посте
     list_editable = ('group',)
+    # Вместо выпадающих списков на все записи — поиск и ввод id
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     # Закрываем пустой объем текстом
     empty_value_display = '-пусто-'
+    # Массовые действия работают кусками по pk, не загружая посты
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_in_chunks',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление грузит в память посты и их комментарии
+        actions.pop('delete_selected', None)
+        return actions
+
+    def log_each(self, queryset, log):
+        # Как у стандартных действий — запись журнала на каждый пост,
+        # но загружается только нужное для подписи
+        posts = queryset.select_related(None).only('pk', 'text')
+        for post in posts.iterator():
+            log(post)
+
+    def move_to_group(self, request, queryset):
+        slug = request.POST.get('group', '')
+        group = None
+        if slug:
+            group = Group.objects.filter(slug=slug).first()
+            if group is None:
+                self.message_user(
+                    request, f'Нет группы {slug}', messages.ERROR
+                )
+                return
+        self.log_each(queryset, lambda post: self.log_change(
+            request, post, [{'changed': {'fields': ['group']}}]
+        ))
+        moved = bulk.move_posts(queryset, group, settings.BULK_CHUNK_SIZE)
+        self.message_user(request, f'Перенесено постов: {moved}')
+
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_in_chunks(self, request, queryset):
+        if request.POST.get('post'):
+            self.log_each(queryset, lambda post: self.log_deletion(
+                request, post, str(post)
+            ))
+            deleted = bulk.delete_posts(queryset, settings.BULK_CHUNK_SIZE)
+            self.message_user(request, f'Удалено постов: {deleted}')
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Удалить посты?',
+            'opts': self.model._meta,
+            'count': queryset.count(),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, 'admin/posts/post/delete_in_chunks.html', context
+        )
+
+    delete_in_chunks.short_description = 'Удалить выбранные посты'
+    delete_in_chunks.allowed_permissions = ('delete',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
 
 
 # При регистрации модели Post источником конфигурации для неё назначаем
 # класс PostAdmin
 admin.site.register(Post, PostAdmin)
 
-admin.site.register(Group)
 
-admin.site.register(Follow)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug',)
+    # Нужен для автодополнения группы в постах
+    search_fields = ('title', 'slug',)
+    prepopulated_fields = {'slug': ('title',)}
+
+
+admin.site.register(Group, GroupAdmin)
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author',)
+    list_select_related = ('user', 'author',)
+    autocomplete_fields = ('user', 'author',)
+    # Точное совпадение имени идет по уникальному индексу
+    search_fields = ('=user__username', '=author__username',)
+
+
+admin.site.register(Follow, FollowAdmin)
+
+
+class CommentAdmin(FullTextSearchAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post',)
+    list_select_related = ('author', 'post',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
+    empty_value_display = '-пусто-'
+
 
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,103 @@
+"""
+Архив постов по месяцам.
+
+Навигация строится по таблице MonthlyBucket: на каждую пару
+(автор или группа, месяц) одна строка с числом постов. Строки
+обновляются сигналами при создании, переносе и удалении поста
+в той же транзакции. Посты месяца выбираются диапазоном по pub_date,
+который покрывается индексами (author, pub_date) и (group, pub_date).
+"""
+from datetime import date, datetime
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MonthlyBucket
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def month_of(moment):
+    """Первый день месяца, к которому относится момент."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def is_valid_month(year, month):
+    """Проверяет, что у месяца есть начало и конец в пределах date."""
+    # Конец декабря — 1 января следующего года, он тоже должен уместиться
+    return 1 <= year < date.max.year and 1 <= month <= 12
+
+
+def month_range(year, month):
+    """Границы месяца для выборки по pub_date: [начало, конец)."""
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def change(scope, month, delta):
+    """Прибавляет к счетчику месяца ``delta`` постов."""
+    updated = MonthlyBucket.objects.filter(
+        scope=scope, month=month
+    ).update(count=F('count') + delta)
+    if not updated and delta > 0:
+        # Первый пост месяца могут добавить два запроса сразу:
+        # INSERT OR IGNORE пустой строки и прибавление к ней
+        MonthlyBucket.objects.bulk_create(
+            [MonthlyBucket(scope=scope, month=month, count=0)],
+            ignore_conflicts=True
+        )
+        MonthlyBucket.objects.filter(
+            scope=scope, month=month
+        ).update(count=F('count') + delta)
+    elif delta < 0:
+        MonthlyBucket.objects.filter(
+            scope=scope, month=month, count__lte=0
+        ).delete()
+
+
+def post_saved(post, created, group_before):
+    """Отражает в архиве новый пост или его перенос в другую группу."""
+    month = month_of(post.pub_date)
+    if created:
+        change(author_scope(post.author_id), month, 1)
+        if post.group_id:
+            change(group_scope(post.group_id), month, 1)
+    elif post.group_id != group_before:
+        if group_before:
+            change(group_scope(group_before), month, -1)
+        if post.group_id:
+            change(group_scope(post.group_id), month, 1)
+
+
+def post_deleted(post, group_before):
+    """Убирает удаленный пост из архива."""
+    month = month_of(post.pub_date)
+    change(author_scope(post.author_id), month, -1)
+    if group_before:
+        change(group_scope(group_before), month, -1)
+
+
+def get_months(scope):
+    """Возвращает годы архива: [(год, [(месяц, число постов), ...]), ...]."""
+    years = []
+    for month, count in MonthlyBucket.objects.filter(
+        scope=scope, count__gt=0
+    ).values_list('month', 'count'):
+        if not years or years[-1][0] != month.year:
+            years.append((month.year, []))
+        years[-1][1].append((month, count))
+    return years
+
+
+def get_count(scope, year, month):
+    """Число постов за месяц или None, если их не было."""
+    return MonthlyBucket.objects.filter(
+        scope=scope, month=date(year, month, 1), count__gt=0
+    ).values_list('count', flat=True).first()
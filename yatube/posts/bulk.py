@@ -0,0 +1,133 @@
+"""
+Массовый перенос и удаление постов.
+
+Выборка обходится кусками по возрастанию pk, каждый кусок меняется
+одним UPDATE или DELETE в своей транзакции, без загрузки постов
+в память. Сигналы на каждый пост при этом не отправляются, поэтому
+счетчики архива, кэши и версии лент обновляются здесь же, по куску.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import archive, feeds, group_directory, post_cache
+from .models import Comment, Group, Post, User
+from .paginator import invalidate_counts
+from .signals import invalidate
+
+
+def iter_chunks(queryset, chunk_size):
+    """Отдает pk выборки кусками, продолжая после последнего ключа."""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        ids = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def _load(db, ids):
+    return list(
+        Post.objects.using(db).filter(pk__in=ids).values_list(
+            'pk', 'author_id', 'group_id', 'pub_date'
+        )
+    )
+
+
+def _apply_archive(deltas):
+    for (scope, month), delta in deltas.items():
+        if delta:
+            archive.change(scope, month, delta)
+
+
+def _invalidate(rows, group_ids, count_keys):
+    author_ids = {author_id for _, author_id, _, _ in rows}
+    usernames = User.objects.filter(
+        pk__in=author_ids
+    ).values_list('username', flat=True)
+    slugs = Group.objects.filter(
+        pk__in=group_ids
+    ).values_list('slug', flat=True)
+    invalidate(group_directory.invalidate, *group_ids)
+    invalidate(post_cache.invalidate, *(row[0] for row in rows))
+    invalidate(invalidate_counts, *count_keys)
+    invalidate(
+        feeds.bump, 'all',
+        *(f'author:{username}' for username in usernames),
+        *(f'group:{slug}' for slug in slugs),
+    )
+
+
+def move_chunk(db, ids, group):
+    """Переносит кусок постов в группу, ``None`` — убирает из групп."""
+    group_id = group.pk if group else None
+    with transaction.atomic(using=db):
+        rows = [row for row in _load(db, ids) if row[2] != group_id]
+        if not rows:
+            return 0
+        Post.objects.using(db).filter(
+            pk__in=[row[0] for row in rows]
+        ).update(group=group_id)
+        deltas = Counter()
+        for _, _, old_group_id, pub_date in rows:
+            month = archive.month_of(pub_date)
+            if old_group_id:
+                deltas[archive.group_scope(old_group_id), month] -= 1
+            if group_id:
+                deltas[archive.group_scope(group_id), month] += 1
+        _apply_archive(deltas)
+    group_ids = {row[2] for row in rows} | {group_id}
+    group_ids.discard(None)
+    _invalidate(rows, group_ids, [f'group:{pk}' for pk in group_ids])
+    return len(rows)
+
+
+def delete_chunk(db, ids):
+    """Удаляет кусок постов, их комментарии остаются без поста."""
+    with transaction.atomic(using=db):
+        rows = _load(db, ids)
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        # Тот же SET_NULL, что сделал бы Collector, но одним UPDATE
+        Comment.objects.using(db).filter(post_id__in=ids).update(post=None)
+        # Collector при подписанных сигналах грузит каждый пост,
+        # поэтому удаляем напрямую; побочные эффекты — ниже
+        Post.objects.using(db).filter(pk__in=ids)._raw_delete(db)
+        deltas = Counter()
+        for _, author_id, group_id, pub_date in rows:
+            month = archive.month_of(pub_date)
+            deltas[archive.author_scope(author_id), month] -= 1
+            if group_id:
+                deltas[archive.group_scope(group_id), month] -= 1
+        _apply_archive(deltas)
+    author_ids = {row[1] for row in rows}
+    group_ids = {row[2] for row in rows} - {None}
+    keys = ['all', 'trending']
+    keys += [f'author:{pk}' for pk in author_ids]
+    keys += [f'group:{pk}' for pk in group_ids]
+    _invalidate(rows, group_ids, keys)
+    return len(rows)
+
+
+def _run(queryset, chunk_size, progress, handler):
+    done = 0
+    for ids in iter_chunks(queryset, chunk_size):
+        done += handler(queryset.db, ids)
+        if progress:
+            progress(done)
+    return done
+
+
+def move_posts(queryset, group, chunk_size, progress=None):
+    """Переносит все посты выборки в группу кусками."""
+    return _run(queryset, chunk_size, progress,
+                lambda db, ids: move_chunk(db, ids, group))
+
+
+def delete_posts(queryset, chunk_size, progress=None):
+    """Удаляет все посты выборки кусками."""
+    return _run(queryset, chunk_size, progress, delete_chunk)
@@ -0,0 +1,181 @@
+"""
+RSS и Atom ленты главной страницы, групп и авторов.
+
+Готовый документ ленты хранится в кэше под версией ее содержимого.
+Версию меняют сигналы поста, она же служит ETag и Last-Modified,
+поэтому повторный опрос без изменений получает 304 по двум обращениям
+к кэшу, без запросов к базе и сборки XML.
+
+Версии меняют и другие процессы сервера, и команды (``bulk_posts``,
+``archive_posts``), поэтому все это работает только с общим кэшем
+(``CACHE_IS_SHARED``). Без него лента собирается при каждом запросе.
+"""
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr, truncatechars
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .models import Group, Post, User
+
+VERSION_KEY = 'feed_version:{}'
+DOCUMENT_KEY = 'feed_document:{}:{}:{}'
+
+
+def get_version(scope):
+    """Возвращает версию содержимого ленты, заводя ее при отсутствии."""
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), settings.FEED_DOCUMENT_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump(*scopes):
+    """Меняет версии лент, в которых изменились посты."""
+    if not settings.CACHE_IS_SHARED:
+        return
+    cache.set_many(
+        {VERSION_KEY.format(scope): time.time_ns() for scope in scopes},
+        settings.FEED_DOCUMENT_TIMEOUT
+    )
+
+
+class PostFeed(Feed):
+    """Общая часть лент постов."""
+
+    def items(self, obj):
+        return self.get_posts(obj)[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 60)
+
+    def item_description(self, item):
+        return linebreaksbr(item.text)
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'id': item.id})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class IndexFeed(PostFeed):
+    title = 'Yatube: последние обновления'
+    description = 'Новые посты на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_posts(self, obj):
+        return Post.objects.with_related('author', 'group').feed()
+
+
+class GroupFeed(PostFeed):
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def get_posts(self, obj):
+        return Post.objects.filter(group=obj).with_related(
+            'author', 'group'
+        ).feed()
+
+
+class AuthorFeed(PostFeed):
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Посты пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def get_posts(self, obj):
+        return Post.objects.for_author(obj.id).with_related('author', 'group')
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = Atom1Feed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def feed_scope(kwargs):
+    """Область ленты по параметрам адреса."""
+    if 'slug' in kwargs:
+        return f'group:{kwargs["slug"]}'
+    if 'username' in kwargs:
+        return f'author:{kwargs["username"]}'
+    return 'all'
+
+
+def cached_feed(feed_class):
+    """Представление ленты с кэшем документа и условными ответами."""
+    feed = feed_class()
+    kind = feed_class.__name__
+
+    def etag(request, **kwargs):
+        return f'{kind}-{get_version(feed_scope(kwargs))}'
+
+    def last_modified(request, **kwargs):
+        version = get_version(feed_scope(kwargs))
+        return datetime.fromtimestamp(version / 10 ** 9, tz=timezone.utc)
+
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def cached(request, **kwargs):
+        scope = feed_scope(kwargs)
+        key = DOCUMENT_KEY.format(kind, scope, get_version(scope))
+        document = cache.get(key)
+        if document is None:
+            response = feed(request, **kwargs)
+            document = (response.content, response['Content-Type'])
+            cache.set(key, document, settings.FEED_DOCUMENT_TIMEOUT)
+        content, content_type = document
+        return HttpResponse(content, content_type=content_type)
+
+    def view(request, **kwargs):
+        if not settings.CACHE_IS_SHARED:
+            return feed(request, **kwargs)
+        return cached(request, **kwargs)
+
+    return view
@@ -0,0 +1,110 @@
+"""
+Индекс графа подписок.
+
+Для каждого пользователя в кэше хранятся два отсортированных массива
+``array('I')``: id авторов, на которых он подписан, и id его подписчиков.
+Проверка «подписан ли я на автора» — бинарный поиск, а список авторов
+для ленты берется без запроса к базе.
+
+Массив лежит под версией, которую подписка и отписка меняют после
+коммита, а не правят массив на месте: правки параллельных запросов
+через get и set затирали бы друг друга. Массив, собранный по старой
+версии, уже никто не читает. Индекс кэшируется только в общем кэше
+(``CACHE_IS_SHARED``), без него массивы собираются из базы при каждом
+чтении, иначе другие процессы не видели бы подписку.
+"""
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follow_graph:following:{}'
+FOLLOWERS_KEY = 'follow_graph:followers:{}'
+ARRAY_KEY = '{}:{}'
+TYPECODE = 'I'
+
+
+def pack(ids):
+    """Упаковывает id в отсортированный массив без повторов."""
+    return array(TYPECODE, sorted(set(ids)))
+
+
+def contains(ids, value):
+    """Проверяет наличие id в отсортированном массиве за O(log n)."""
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # add не перетирает версию, заведенную параллельно
+        cache.add(key, time.time_ns(), settings.FOLLOW_GRAPH_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def _get(key, **lookup):
+    field = 'author_id' if 'user_id' in lookup else 'user_id'
+
+    def load():
+        return pack(
+            Follow.objects.filter(
+                author__isnull=False, **lookup
+            ).values_list(field, flat=True)
+        )
+
+    if not settings.CACHE_IS_SHARED:
+        return load()
+    array_key = ARRAY_KEY.format(key, _get_version(key))
+    ids = cache.get(array_key)
+    if ids is None:
+        ids = load()
+        cache.set(array_key, ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def get_following(user_id):
+    """Возвращает id авторов, на которых подписан пользователь."""
+    return _get(FOLLOWING_KEY.format(user_id), user_id=user_id)
+
+
+def get_followers(author_id):
+    """Возвращает id подписчиков автора."""
+    return _get(FOLLOWERS_KEY.format(author_id), author_id=author_id)
+
+
+def is_following(user_id, author_id):
+    """Проверяет, подписан ли пользователь на автора."""
+    return contains(get_following(user_id), author_id)
+
+
+def _bump(keys):
+    """Меняет версии массивов, старые пересоберутся при чтении."""
+    if settings.CACHE_IS_SHARED:
+        cache.set_many(
+            {key: time.time_ns() for key in keys},
+            settings.FOLLOW_GRAPH_TIMEOUT
+        )
+
+
+def add_follow(user_id, author_id):
+    """Отражает в индексе новую подписку."""
+    update_follows(user_id, [author_id], add=True)
+
+
+def remove_follow(user_id, author_id):
+    """Отражает в индексе отписку."""
+    update_follows(user_id, [author_id], add=False)
+
+
+def update_follows(user_id, author_ids, add):
+    """Отражает в индексе подписку или отписку сразу на многих авторов."""
+    _bump([
+        FOLLOWING_KEY.format(user_id),
+        *(FOLLOWERS_KEY.format(author_id) for author_id in author_ids),
+    ])
@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 
 from .models import Comment, Post
 
@@ -15,3 +16,27 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class UsernameListField(forms.Field):
+    """Список имен пользователей из повторяющегося поля запроса."""
+
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        names = [name.strip() for name in value or [] if name.strip()]
+        return list(dict.fromkeys(names))
+
+    def validate(self, value):
+        super().validate(value)
+        if len(value) > settings.FOLLOW_BULK_LIMIT:
+            raise forms.ValidationError(
+                f'Не больше {settings.FOLLOW_BULK_LIMIT} авторов за раз'
+            )
+
+
+class BulkFollowForm(forms.Form):
+    action = forms.ChoiceField(
+        choices=(('follow', 'Подписаться'), ('unfollow', 'Отписаться'))
+    )
+    authors = UsernameListField()
@@ -0,0 +1,103 @@
+"""
+Сборка мусора: комментарии удаленных постов и ненужные картинки.
+
+У ``Comment.post`` стоит ``SET_NULL``, поэтому после удаления поста
+комментарии остаются без поста; после сырых удалений (массовое удаление,
+перенос между шардами) у них может остаться ``post_id`` поста, которого
+в шарде уже нет. И те и другие удаляются кусками по pk.
+Картинки собираются по схеме mark-and-sweep: сначала со всех шардов
+собираются имена, на которые ссылаются посты, в том числе архивные,
+затем обходится каталог загрузок и удаляется все остальное вместе
+с превью sorl.
+Свежие файлы не трогаются: пост с только что загруженной картинкой
+мог еще не сохраниться. Удаление идет не быстрее заданного темпа,
+чтобы не забивать диск и базу.
+"""
+import posixpath
+import time
+from datetime import timedelta
+from itertools import product
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+
+from .bulk import iter_chunks
+from .models import ArchivedPost, Comment, Post
+
+
+class Throttle:
+    """Не дает выполнять операции чаще ``rate`` в секунду."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.last = None
+
+    def wait(self):
+        if self.last is not None:
+            pause = self.interval - (time.monotonic() - self.last)
+            if pause > 0:
+                time.sleep(pause)
+        self.last = time.monotonic()
+
+
+def delete_orphan_comments(db, chunk_size, throttle, dry_run=False):
+    """Удаляет комментарии без поста, возвращает их число."""
+    # Пустой post_id тоже не находит поста
+    orphans = Comment.objects.using(db).annotate(
+        has_post=Exists(Post.objects.filter(pk=OuterRef('post_id')))
+    ).filter(has_post=False)
+    found = 0
+    for ids in iter_chunks(orphans, chunk_size):
+        found += len(ids)
+        if dry_run:
+            continue
+        throttle.wait()
+        # Сигнал комментария сбрасывает кэш поста, а поста уже нет
+        Comment.objects.using(db).filter(pk__in=ids)._raw_delete(db)
+    return found
+
+
+def referenced_images():
+    """Имена картинок, на которые ссылаются посты всех шардов."""
+    names = set()
+    for model, shard in product((Post, ArchivedPost), settings.POST_SHARDS):
+        names.update(
+            model.objects.using(shard).exclude(image='').values_list(
+                'image', flat=True
+            ).iterator()
+        )
+    return names
+
+
+def walk(storage, path):
+    """Обходит каталог хранилища, отдавая имена файлов."""
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+def sweep_media(throttle, dry_run=False):
+    """Удаляет картинки постов, на которые никто не ссылается."""
+    storage = default_storage
+    upload_to = Post._meta.get_field('image').upload_to.rstrip('/')
+    if not storage.exists(upload_to):
+        return []
+    keep = referenced_images()
+    cutoff = timezone.now() - timedelta(seconds=settings.GC_MEDIA_GRACE)
+    removed = []
+    for name in walk(storage, upload_to):
+        if name in keep:
+            continue
+        throttle.wait()
+        if storage.get_modified_time(name) > cutoff:
+            continue
+        removed.append(name)
+        if not dry_run:
+            # Вместе с файлом уходят его превью и записи sorl о них
+            delete_image(name, delete_file=True)
+    return removed
@@ -0,0 +1,107 @@
+"""
+Агрегаты для каталога групп.
+
+Число постов, дата и превью последнего поста каждой группы кэшируются
+по отдельности и сбрасываются при изменении постов этой группы.
+Недостающие значения для страницы каталога считаются одним запросом,
+а если посты разнесены по шардам — запросом к каждому шарду.
+Архивные посты учитываются в числе постов отдельным запросом.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Substr
+
+from . import sharding
+from .models import ArchivedPost, Group, Post
+
+STATS_KEY = 'group_stats:{}'
+
+
+def _compute(group_ids):
+    latest = Post.objects.filter(
+        group=OuterRef('pk')
+    ).order_by('-pub_date')
+    rows = Group.objects.filter(pk__in=group_ids).annotate(
+        post_count=Count('posts'),
+        last_pub_date=Max('posts__pub_date'),
+        last_post_id=Subquery(latest.values('id')[:1]),
+        last_post_text=Subquery(
+            latest.annotate(
+                preview=Substr('text', 1, settings.GROUP_PREVIEW_LENGTH)
+            ).values('preview')[:1]
+        ),
+    ).values(
+        'id', 'post_count', 'last_pub_date', 'last_post_id', 'last_post_text'
+    )
+    return {row.pop('id'): row for row in rows}
+
+
+def _compute_sharded(group_ids):
+    stats = {
+        group_id: {'post_count': 0, 'last_pub_date': None,
+                   'last_post_id': None, 'last_post_text': None}
+        for group_id in group_ids
+    }
+    for shard in settings.POST_SHARDS:
+        latest = Post.objects.using(shard).filter(
+            group=OuterRef('group_id')
+        ).order_by('-pub_date')
+        rows = Post.objects.using(shard).filter(
+            group_id__in=group_ids
+        ).values('group_id').annotate(
+            post_count=Count('id'),
+            last_pub_date=Max('pub_date'),
+            last_post_id=Subquery(latest.values('id')[:1]),
+            last_post_text=Subquery(
+                latest.annotate(
+                    preview=Substr('text', 1, settings.GROUP_PREVIEW_LENGTH)
+                ).values('preview')[:1]
+            ),
+        ).order_by()
+        for row in rows:
+            merged = stats[row.pop('group_id')]
+            merged['post_count'] += row.pop('post_count')
+            if (merged['last_pub_date'] is None
+                    or row['last_pub_date'] > merged['last_pub_date']):
+                merged.update(row)
+    return stats
+
+
+def _add_archived(stats, group_ids):
+    # Последний пост группы всегда в горячей части, если он там есть,
+    # а архивные посты добавляются только к числу
+    for shard in settings.POST_SHARDS:
+        rows = ArchivedPost.objects.using(shard).filter(
+            group_id__in=group_ids
+        ).values('group_id').annotate(post_count=Count('id')).order_by()
+        for row in rows:
+            stats[row['group_id']]['post_count'] += row['post_count']
+    return stats
+
+
+def get_stats(group_ids):
+    """Возвращает агрегаты групп, досчитывая отсутствующие в кэше."""
+    keys = {STATS_KEY.format(group_id): group_id for group_id in group_ids}
+    cached = cache.get_many(keys)
+    stats = {keys[key]: value for key, value in cached.items()}
+    missing = [group_id for group_id in group_ids if group_id not in stats]
+    if missing:
+        if sharding.is_sharded():
+            computed = _compute_sharded(missing)
+        else:
+            computed = _compute(missing)
+        computed = _add_archived(computed, missing)
+        cache.set_many(
+            {STATS_KEY.format(k): v for k, v in computed.items()},
+            settings.GROUP_STATS_TIMEOUT
+        )
+        stats.update(computed)
+    return stats
+
+
+def invalidate(*group_ids):
+    """Сбрасывает агрегаты групп, в которых изменились посты."""
+    cache.delete_many(
+        [STATS_KEY.format(group_id) for group_id in group_ids if group_id]
+    )
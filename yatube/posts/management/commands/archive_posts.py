@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import partition
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Переносить посты старше стольких дней.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BULK_CHUNK_SIZE,
+            help='Сколько постов переносить за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать посты, которые будут перенесены.'
+        )
+
+    def handle(self, *args, **options):
+        moment = partition.cutoff(options['days'])
+        total = 0
+        for shard in settings.POST_SHARDS:
+            if options['dry_run']:
+                found = Post.objects.using(shard).filter(
+                    pub_date__lt=moment
+                ).count()
+                self.stdout.write(f'{shard}: будет перенесено {found}')
+                total += found
+                continue
+
+            def progress(done, shard=shard):
+                self.stdout.write(f'{shard}: {done}')
+
+            total += partition.archive_before(
+                shard, moment, options['chunk_size'], progress
+            )
+        self.stdout.write(f'В архив до {moment:%Y-%m-%d}: {total} постов')
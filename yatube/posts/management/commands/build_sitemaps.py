@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import heapq
+import json
+import os
+from itertools import groupby, product
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import ArchivedPost, Group, Post, User
+
+URLSET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+INDEX_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+MANIFEST = 'manifest.json'
+
+
+def url_entry(path, lastmod=None):
+    loc = escape(settings.SITE_URL + path)
+    if lastmod is None:
+        return f'<url><loc>{loc}</loc></url>\n'
+    return (f'<url><loc>{loc}</loc>'
+            f'<lastmod>{lastmod.date().isoformat()}</lastmod></url>\n')
+
+
+def index_entry(name, lastmod):
+    loc = escape(settings.SITE_URL + settings.SITEMAP_URL + name)
+    return f'<sitemap><loc>{loc}</loc><lastmod>{lastmod}</lastmod></sitemap>\n'
+
+
+def post_rows(chunk_size):
+    # Архивные посты доступны по тем же адресам, а id постов
+    # уникальны во всех шардах, поэтому источники сливаются по id
+    sources = [
+        model.objects.using(shard).order_by('pk').values_list(
+            'pk', 'pub_date'
+        ).iterator(chunk_size=chunk_size)
+        for model, shard in product((Post, ArchivedPost), settings.POST_SHARDS)
+    ]
+    for post_id, pub_date in heapq.merge(*sources):
+        yield post_id, url_entry(
+            reverse('posts:post_detail', kwargs={'id': post_id}), pub_date
+        )
+
+
+def profile_rows(chunk_size):
+    users = User.objects.filter(is_active=True).order_by(
+        'pk'
+    ).values_list('pk', 'username').iterator(chunk_size=chunk_size)
+    for pk, username in users:
+        yield pk, url_entry(
+            reverse('posts:profile', kwargs={'username': username})
+        )
+
+
+def group_rows(chunk_size):
+    groups = Group.objects.order_by('pk').values_list(
+        'pk', 'slug'
+    ).iterator(chunk_size=chunk_size)
+    for pk, slug in groups:
+        yield pk, url_entry(reverse('posts:group_list', kwargs={'slug': slug}))
+
+
+SECTIONS = (
+    ('groups', group_rows),
+    ('profiles', profile_rows),
+    ('posts', post_rows),
+)
+
+
+def by_pk_range(rows, size):
+    """Делит упорядоченные по pk адреса на диапазоны pk по ``size``."""
+    for number, part in groupby(rows, key=lambda row: row[0] // size):
+        yield number, [entry for _, entry in part]
+
+
+class Command(BaseCommand):
+    help = ('Пишет gzip-сайтмапы постов, профилей и групп с индексом; '
+            'перезаписывает только изменившиеся части.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard-size', type=int, default=settings.SITEMAP_SHARD_SIZE,
+            help='Ширина диапазона pk одного файла, она же наибольшее '
+                 'число адресов в нем (не больше 50000).'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def write(self, name, data):
+        path = os.path.join(settings.SITEMAP_ROOT, name)
+        temp = f'{path}.tmp'
+        with open(temp, 'wb') as file:
+            file.write(data)
+        os.replace(temp, path)
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(settings.SITEMAP_ROOT, MANIFEST)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def handle(self, *args, **options):
+        os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+        shard_size = min(options['shard_size'], 50000)
+        chunk_size = options['chunk_size']
+        old = self.load_manifest()
+        manifest = {}
+        written = 0
+        # Файл покрывает постоянный диапазон pk своего типа, поэтому
+        # новая или удаленная запись меняет только свой файл
+        for kind, rows in SECTIONS:
+            parts = by_pk_range(rows(chunk_size), shard_size)
+            for number, urls in parts:
+                name = f'sitemap-{kind}-{number:05d}.xml.gz'
+                content = ''.join(
+                    [URLSET_HEAD, *urls, '</urlset>\n']
+                ).encode()
+                digest = hashlib.sha256(content).hexdigest()
+                previous = old.get(name, {})
+                exists = os.path.exists(
+                    os.path.join(settings.SITEMAP_ROOT, name)
+                )
+                if previous.get('sha256') == digest and exists:
+                    manifest[name] = previous
+                    continue
+                self.write(name, gzip.compress(content, mtime=0))
+                manifest[name] = {
+                    'sha256': digest,
+                    'lastmod': timezone.now().date().isoformat(),
+                }
+                written += 1
+        for name in set(old) - set(manifest):
+            path = os.path.join(settings.SITEMAP_ROOT, name)
+            if os.path.exists(path):
+                os.remove(path)
+        index = ''.join([INDEX_HEAD, *(
+            index_entry(name, entry['lastmod'])
+            for name, entry in sorted(manifest.items())
+        ), '</sitemapindex>\n'])
+        self.write('sitemap.xml', index.encode())
+        self.write(MANIFEST, json.dumps(manifest, indent=2).encode())
+        self.stdout.write(
+            f'Файлов сайтмапа: {len(manifest)}, перезаписано: {written}'
+        )
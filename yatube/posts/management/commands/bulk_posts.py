@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Переносит посты в другую группу или удаляет их частями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='Посты какой группы брать.')
+        parser.add_argument('--author', help='Посты какого автора брать.')
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            '--to', help='Группа, в которую переносить; "-" — без группы.'
+        )
+        action.add_argument(
+            '--delete', action='store_true', help='Удалить посты.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BULK_CHUNK_SIZE,
+            help='Сколько постов менять за одну транзакцию.'
+        )
+
+    def get_group(self, slug):
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise CommandError(f'Нет группы {slug}')
+        return group
+
+    def get_filters(self, options):
+        filters = {}
+        if options['group']:
+            filters['group'] = self.get_group(options['group'])
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Нет пользователя {options["author"]}')
+            filters['author'] = author
+        if not filters:
+            raise CommandError('Укажите --group или --author')
+        return filters
+
+    def handle(self, *args, **options):
+        if not options['to'] and not options['delete']:
+            raise CommandError('Укажите --to или --delete')
+        filters = self.get_filters(options)
+        target = None
+        if options['to'] and options['to'] != '-':
+            target = self.get_group(options['to'])
+        total = 0
+        for shard in settings.POST_SHARDS:
+            queryset = Post.objects.using(shard).filter(**filters)
+
+            def progress(done, shard=shard):
+                self.stdout.write(f'{shard}: {done}')
+
+            if options['delete']:
+                total += bulk.delete_posts(
+                    queryset, options['chunk_size'], progress
+                )
+            else:
+                total += bulk.move_posts(
+                    queryset, target, options['chunk_size'], progress
+                )
+        verb = 'Удалено' if options['delete'] else 'Перенесено'
+        self.stdout.write(f'{verb} постов: {total}')
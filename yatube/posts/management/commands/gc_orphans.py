@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import gc
+
+
+class Command(BaseCommand):
+    help = ('Удаляет комментарии удаленных постов и картинки, '
+            'на которые не ссылается ни один пост.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.BULK_CHUNK_SIZE,
+            help='Сколько комментариев удалять за один запрос.'
+        )
+        parser.add_argument(
+            '--skip-comments', action='store_true',
+            help='Не трогать комментарии.'
+        )
+        parser.add_argument(
+            '--skip-media', action='store_true',
+            help='Не трогать файлы.'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        if not options['skip_comments']:
+            throttle = gc.Throttle(settings.GC_CHUNK_RATE)
+            for shard in settings.POST_SHARDS:
+                found = gc.delete_orphan_comments(
+                    shard, options['chunk_size'], throttle, dry_run
+                )
+                self.stdout.write(
+                    f'{shard}: {verb} комментариев без поста: {found}'
+                )
+        if not options['skip_media']:
+            removed = gc.sweep_media(
+                gc.Throttle(settings.GC_MEDIA_RATE), dry_run
+            )
+            if dry_run:
+                for name in removed:
+                    self.stdout.write(name)
+            self.stdout.write(f'{verb} файлов: {len(removed)}')
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import post_cache, sharding
+from posts.models import AuthorShard, Comment, Post, PostLocation, User
+from posts.signals import invalidate
+
+
+class Command(BaseCommand):
+    help = 'Заполняет каталог шардов и переносит посты автора в другой шард.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--init', action='store_true',
+            help='Занести в каталог посты основной базы и закрепить '
+                 'их авторов за ней.'
+        )
+        parser.add_argument('--author', help='Чьи посты переносить.')
+        parser.add_argument('--to', help='Шард, в который переносить.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько постов переносить за одну транзакцию.'
+        )
+
+    def init_directory(self):
+        ids = Post.objects.using('default').values_list('pk', flat=True)
+        PostLocation.objects.bulk_create(
+            [PostLocation(pk=post_id, shard='default') for post_id in ids],
+            ignore_conflicts=True,
+        )
+        authors = Post.objects.using('default').values_list(
+            'author_id', flat=True
+        ).distinct()
+        AuthorShard.objects.bulk_create(
+            [AuthorShard(author_id=author_id, shard='default')
+             for author_id in authors],
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'В каталоге {len(ids)} постов')
+
+    def move_chunk(self, post_ids, source, target):
+        # Посты, уже скопированные прерванным запуском, не копируем
+        # повторно, но из источника все равно удаляем
+        copied = set(
+            Post.objects.using(target).filter(
+                pk__in=post_ids
+            ).values_list('pk', flat=True)
+        )
+        missing = [post_id for post_id in post_ids if post_id not in copied]
+        posts = list(Post.objects.using(source).filter(pk__in=missing))
+        comments = list(
+            Comment.objects.using(source).filter(post_id__in=missing)
+        )
+        # id комментариев свои в каждом шарде, поэтому выдаем новые
+        for comment in comments:
+            comment.pk = None
+        with transaction.atomic(using=target):
+            Post.objects.using(target).bulk_create(posts)
+            Comment.objects.using(target).bulk_create(comments)
+        PostLocation.objects.filter(pk__in=post_ids).update(shard=target)
+        cache.delete_many(
+            [sharding.POST_KEY.format(post_id) for post_id in post_ids]
+        )
+        # Посты лишь переезжают, поэтому без сигналов: архив по месяцам
+        # и счетчики лент не меняются. Комментарии удаляем явно,
+        # иначе SET_NULL оставил бы их в источнике без поста
+        with transaction.atomic(using=source):
+            Comment.objects.using(source).filter(
+                post_id__in=post_ids
+            )._raw_delete(source)
+            Post.objects.using(source).filter(
+                pk__in=post_ids
+            )._raw_delete(source)
+        invalidate(post_cache.invalidate, *post_ids)
+
+    def move_author(self, username, target, chunk_size):
+        if target not in settings.POST_SHARDS:
+            raise CommandError(f'Неизвестный шард {target}')
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise CommandError(f'Нет пользователя {username}')
+        source = sharding.shard_for_author(author.id)
+        if source == target:
+            self.stdout.write('Посты автора уже в этом шарде')
+            return
+        moved = 0
+        # Второй проход подбирает посты, созданные в старом шарде
+        # до переключения автора
+        for switched in (False, True):
+            ids = list(
+                Post.objects.using(source).filter(
+                    author_id=author.id
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+            for start in range(0, len(ids), chunk_size):
+                self.move_chunk(ids[start:start + chunk_size], source, target)
+            moved += len(ids)
+            if not switched:
+                AuthorShard.objects.update_or_create(
+                    author_id=author.id, defaults={'shard': target}
+                )
+                cache.delete(sharding.AUTHOR_KEY.format(author.id))
+        self.stdout.write(f'Перенесено {moved} постов: {source} → {target}')
+
+    def handle(self, *args, **options):
+        if not sharding.is_sharded():
+            self.stdout.write('Шарды не настроены (YATUBE_POST_SHARDS)')
+            return
+        if options['init']:
+            self.init_directory()
+        if options['author']:
+            if not options['to']:
+                raise CommandError('Укажите шард в --to')
+            self.move_author(
+                options['author'], options['to'], options['chunk_size']
+            )
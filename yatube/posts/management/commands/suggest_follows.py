@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import build_suggestions, chunked
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «На кого подписаться».'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать всех, а не только изменивших подписки.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько пользователей обрабатывать за проход.'
+        )
+
+    def get_user_ids(self, everyone):
+        followers = Follow.objects.values_list(
+            'user_id', flat=True
+        ).distinct().order_by('user_id')
+        if everyone:
+            return list(followers)
+        stale = FollowSuggestion.objects.filter(
+            is_stale=True
+        ).values_list('user_id', flat=True)
+        missing = followers.exclude(
+            user_id__in=FollowSuggestion.objects.values('user_id')
+        )
+        return sorted(set(stale) | set(missing))
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        limit = settings.FOLLOW_SUGGESTIONS_STORED
+        user_ids = self.get_user_ids(options['all'])
+        for chunk in chunked(user_ids, chunk_size):
+            existing = set(
+                FollowSuggestion.objects.filter(
+                    user_id__in=chunk
+                ).values_list('user_id', flat=True)
+            )
+            # Сбрасываем флаг до чтения подписок: подписка, сделанная
+            # во время пересчета, снова пометит пользователя
+            FollowSuggestion.objects.filter(
+                user_id__in=existing
+            ).update(is_stale=False)
+            suggestions = build_suggestions(chunk, limit, chunk_size)
+            with transaction.atomic():
+                for user_id in existing:
+                    FollowSuggestion.objects.filter(user_id=user_id).update(
+                        authors=','.join(map(str, suggestions[user_id])),
+                        updated=timezone.now(),
+                    )
+                FollowSuggestion.objects.bulk_create(
+                    [
+                        FollowSuggestion(
+                            user_id=user_id,
+                            authors=','.join(map(str, suggestions[user_id])),
+                            is_stale=False,
+                        )
+                        for user_id in chunk if user_id not in existing
+                    ],
+                    ignore_conflicts=True,
+                )
+        self.stdout.write(
+            f'Рекомендации пересчитаны для {len(user_ids)} пользователей'
+        )
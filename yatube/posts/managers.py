@@ -0,0 +1,50 @@
+from django.db import models
+
+from . import sharding
+
+
+class ShardedQuerySet(models.QuerySet):
+    """Выборки из таблиц, разнесенных по шардам."""
+
+    def with_related(self, *fields):
+        """Подгружает связи: JOIN в одной базе, отдельным запросом между."""
+        if sharding.is_sharded():
+            return self.prefetch_related(*fields)
+        return self.select_related(*fields)
+
+
+class PostQuerySet(ShardedQuerySet):
+    """Выборки постов с учетом шардов."""
+
+    def _in_shard(self, shard):
+        # Без шардов базу не закрепляем, чтобы чтение могло уйти
+        # на реплику через маршрутизатор
+        if sharding.is_sharded():
+            return self.using(shard)
+        return self
+
+    def for_author(self, author_id):
+        """Посты автора из его шарда."""
+        return self._in_shard(
+            sharding.shard_for_author(author_id)
+        ).filter(author_id=author_id)
+
+    def locate(self, post_id):
+        """Выборка из шарда, в котором лежит пост."""
+        return self._in_shard(sharding.shard_for_post(post_id))
+
+    def create(self, **kwargs):
+        """Создает пост в шарде автора, если база не выбрана явно."""
+        if self._db is None and sharding.is_sharded():
+            author = kwargs.get('author')
+            author_id = kwargs.get('author_id') or author.pk
+            return self.using(
+                sharding.shard_for_author(author_id)
+            ).create(**kwargs)
+        return super().create(**kwargs)
+
+    def feed(self):
+        """Лента по всем шардам или обычная выборка, если шард один."""
+        if sharding.is_sharded():
+            return sharding.ShardedFeed(self)
+        return self
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0022_auto_20220508_1901'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('authors', models.TextField(blank=True, help_text='id авторов через запятую, по убыванию веса', verbose_name='Рекомендованные авторы')),
+                ('is_stale', models.BooleanField(db_index=True, default=True, verbose_name='Требует пересчета')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата пересчета')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='follow_suggestion', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация',
+                'verbose_name_plural': 'Рекомендации',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trend_score',
+            field=models.FloatField(db_index=True, default=0, help_text='Логарифм суммы затухающих весов активности', verbose_name='Рейтинг популярности'),
+        ),
+    ]
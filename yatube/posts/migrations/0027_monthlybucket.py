@@ -0,0 +1,61 @@
+# Generated by Django 2.2.19 on 2026-10-19 09:08
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_buckets(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MonthlyBucket = apps.get_model('posts', 'MonthlyBucket')
+    db = schema_editor.connection.alias
+    counts = Counter()
+    posts = Post.objects.using(db).values_list(
+        'author_id', 'group_id', 'pub_date'
+    ).iterator()
+    for author_id, group_id, pub_date in posts:
+        month = timezone.localtime(pub_date).date().replace(day=1)
+        counts[f'author:{author_id}', month] += 1
+        if group_id:
+            counts[f'group:{group_id}', month] += 1
+    MonthlyBucket.objects.using(db).bulk_create(
+        [
+            MonthlyBucket(scope=scope, month=month, count=count)
+            for (scope, month), count in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text='author:<id> или group:<id>', max_length=50, verbose_name='Лента')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+            ],
+            options={
+                'verbose_name': 'Месяц архива',
+                'verbose_name_plural': 'Месяцы архива',
+                'ordering': ('scope', '-month'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlybucket',
+            unique_together={('scope', 'month')},
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
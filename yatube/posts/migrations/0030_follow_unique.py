@@ -0,0 +1,33 @@
+# Generated by Django 2.2.19 on 2026-10-19 09:24
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicates(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    db = schema_editor.connection.alias
+    duplicates = Follow.objects.using(db).values(
+        'user_id', 'author_id'
+    ).annotate(
+        copies=Count('id'), keep=Min('id')
+    ).filter(copies__gt=1).order_by()
+    for row in duplicates:
+        Follow.objects.using(db).filter(
+            user_id=row['user_id'], author_id=row['author_id']
+        ).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0029_archived_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='follow_unique'),
+        ),
+    ]
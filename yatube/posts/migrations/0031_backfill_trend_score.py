@@ -0,0 +1,47 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+CHUNK_SIZE = 500
+
+
+def backfill(apps, schema_editor):
+    """Выдает постам без рейтинга начальный по дате публикации."""
+    Post = apps.get_model('posts', 'Post')
+    db = schema_editor.connection.alias
+    rate = math.log(2) / settings.TRENDING_HALF_LIFE
+    weight = math.log(settings.TRENDING_WEIGHTS['post'])
+    last = 0
+    while True:
+        posts = list(
+            Post.objects.using(db).filter(
+                pk__gt=last, trend_score=0
+            ).order_by('pk').only('pk', 'pub_date')[:CHUNK_SIZE]
+        )
+        if not posts:
+            return
+        for post in posts:
+            post.trend_score = weight + rate * (
+                post.pub_date - EPOCH
+            ).total_seconds()
+        Post.objects.using(db).bulk_update(posts, ['trend_score'])
+        last = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0030_follow_unique'),
+    ]
+
+    operations = [
+        # Подсказка нужна, чтобы миграция прошла и в шардах постов
+        migrations.RunPython(
+            backfill, migrations.RunPython.noop,
+            hints={'model_name': 'post'}
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .managers import PostQuerySet, ShardedQuerySet
+
 User = get_user_model()
 
 
@@ -18,6 +20,7 @@ class Post(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='posts',
         verbose_name='Автор'
     )
@@ -26,6 +29,7 @@ class Post(models.Model):
         blank=True,
         null=True,
         on_delete=models.SET_NULL,
+        db_constraint=False,
         related_name='posts',
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
@@ -37,6 +41,17 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    trend_score = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Рейтинг популярности',
+        help_text='Логарифм суммы затухающих весов активности'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    # Архивный пост только читается: без правки и комментариев
+    is_archived = False
 
     def __str__(self):
         """Возвращает текст поста."""
@@ -47,6 +62,15 @@ class Post(models.Model):
         Сортирует посты по дате и добавляет русские название в админке.
         """
         ordering = ('-pub_date', )
+        indexes = (
+            models.Index(fields=('-pub_date',), name='post_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date'), name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'), name='post_author_date_idx'
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -89,6 +113,7 @@ class Comment(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='comments',
         verbose_name='Автор'
     )
@@ -101,6 +126,8 @@ class Comment(models.Model):
         verbose_name='Дата создания комментария'
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     def __str__(self):
         """Возвращает текст комментария."""
         return self.text[:15]
@@ -110,6 +137,9 @@ class Comment(models.Model):
         Сортирует комментарии по дате и добавляет русские названия в админке.
         """
         ordering = ('-created', )
+        indexes = (
+            models.Index(fields=('-created',), name='comment_created_idx'),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -133,7 +163,201 @@ class Follow(models.Model):
 
     class Meta:
         """
-        Добавляет русские названия в админке.
+        Запрещает повторную подписку и добавляет русские названия в админке.
         """
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='follow_unique'
+            ),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class FollowSuggestion(models.Model):
+    """Хранит рекомендованных пользователю авторов."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestion',
+        verbose_name='Пользователь'
+    )
+    authors = models.TextField(
+        blank=True,
+        verbose_name='Рекомендованные авторы',
+        help_text='id авторов через запятую, по убыванию веса'
+    )
+    is_stale = models.BooleanField(
+        default=True,
+        db_index=True,
+        verbose_name='Требует пересчета'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата пересчета'
+    )
+
+    class Meta:
+        """
+        Добавляет русские названия в админке.
+        """
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+
+class PostLocation(models.Model):
+    """
+    Каталог шардов постов.
+
+    Автоинкремент этой таблицы выдает глобальные id постов,
+    когда посты разнесены по нескольким базам.
+    """
+
+    shard = models.CharField(max_length=50, verbose_name='Шард')
+
+    class Meta:
+        """
+        Добавляет русские названия в админке.
+        """
+        verbose_name = 'Размещение поста'
+        verbose_name_plural = 'Размещение постов'
+
+
+class AuthorShard(models.Model):
+    """Закрепляет автора за шардом после перебалансировки."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    shard = models.CharField(max_length=50, verbose_name='Шард')
+
+    class Meta:
+        """
+        Добавляет русские названия в админке.
+        """
+        verbose_name = 'Шард автора'
+        verbose_name_plural = 'Шарды авторов'
+
+
+class MonthlyBucket(models.Model):
+    """Число постов автора или группы за месяц, для навигации по архиву."""
+
+    scope = models.CharField(
+        max_length=50,
+        verbose_name='Лента',
+        help_text='author:<id> или group:<id>'
+    )
+    month = models.DateField(verbose_name='Месяц')
+    count = models.PositiveIntegerField(default=0, verbose_name='Постов')
+
+    class Meta:
+        """
+        Сортирует месяцы от новых к старым и добавляет русские названия.
+        """
+        ordering = ('scope', '-month')
+        unique_together = ('scope', 'month')
+        verbose_name = 'Месяц архива'
+        verbose_name_plural = 'Месяцы архива'
+
+
+class ArchivedPost(models.Model):
+    """
+    Пост, перенесенный в архив командой archive_posts.
+
+    Id и дата публикации сохраняются, поэтому ссылки на пост
+    продолжают работать.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField(verbose_name='Дата создания поста')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name='archived_posts',
+        verbose_name='Группа'
+    )
+    image = models.ImageField(
+        verbose_name='Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    is_archived = True
+
+    def __str__(self):
+        """Возвращает текст поста."""
+        return self.text[:15]
+
+    class Meta:
+        """
+        Сортирует посты по дате и добавляет русские названия в админке.
+        """
+        ordering = ('-pub_date', )
+        indexes = (
+            models.Index(
+                fields=('-pub_date',), name='archived_post_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='archived_post_group_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='archived_post_author_idx'
+            ),
+        )
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+
+class ArchivedComment(models.Model):
+    """Комментарий к архивному посту."""
+
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    created = models.DateTimeField(verbose_name='Дата создания комментария')
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        """Возвращает текст комментария."""
+        return self.text[:15]
+
+    class Meta:
+        """
+        Сортирует комментарии по дате и добавляет русские названия в админке.
+        """
+        ordering = ('-created', )
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
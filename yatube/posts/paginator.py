@@ -1,9 +1,193 @@
+"""
+Пагинация лент.
+
+Число записей ленты кэшируется по ключу ленты и сбрасывается
+сигналами при появлении, удалении или переносе поста. Ленту подписок
+меняет пост любого из авторов, поэтому ее число не сбрасывается,
+а хранится недолго. Считается
+оно не дальше ``FEED_COUNT_LIMIT``: у огромной ленты показывается
+«10000+», и ради номера последней страницы таблица не сканируется.
+Последней страницы у такой ленты нет, а о следующей говорит лишняя
+запись, выбранная вместе со страницей.
+
+Для длинных списков без номеров страниц есть пагинация по ключу:
+следующая страница начинается после id последней записи текущей,
+и ее стоимость не зависит от того, насколько далеко она от начала.
+"""
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.utils.functional import cached_property
+
+COUNT_KEY = 'feed_count:{}'
+
+
+def bounded_count(object_list, limit):
+    """Считает записи, но не больше ``limit + 1``."""
+    if hasattr(object_list, 'bounded_count'):
+        return object_list.bounded_count(limit)
+    if hasattr(object_list, 'query'):
+        return object_list[:limit + 1].count()
+    return min(len(object_list), limit + 1)
+
+
+def feed_count(key, object_list, timeout=None):
+    """Возвращает число записей ленты из кэша или считает его."""
+    count = cache.get(COUNT_KEY.format(key)) if key else None
+    if count is None:
+        count = bounded_count(object_list, settings.FEED_COUNT_LIMIT)
+        if key:
+            cache.set(
+                COUNT_KEY.format(key), count,
+                timeout or settings.FEED_COUNT_TIMEOUT
+            )
+    return count
+
+
+def count_display(count):
+    """Число записей для показа: «10000+» сверх предела подсчета."""
+    if count > settings.FEED_COUNT_LIMIT:
+        return f'{settings.FEED_COUNT_LIMIT}+'
+    return count
+
+
+def invalidate_counts(*keys):
+    """Сбрасывает закэшированные числа записей лент."""
+    cache.delete_many([COUNT_KEY.format(key) for key in keys])
+
+
+class PostPaginator(Paginator):
+    """
+    Пагинатор лент с кэшированным приблизительным числом записей.
+
+    В ленте выводятся первые и последние страницы и окно вокруг
+    текущей, пропуски заменяются многоточием. Число ссылок
+    не зависит от числа страниц.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_timeout = count_timeout
 
+    @cached_property
+    def count(self):
+        return feed_count(
+            self.count_key, self.object_list, self.count_timeout
+        )
 
-def paginator(posts, request):
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
+    @property
+    def is_approximate(self):
+        return self.count > settings.FEED_COUNT_LIMIT
+
+    @property
+    def count_display(self):
+        return count_display(self.count)
+
+    def validate_number(self, number):
+        if not self.is_approximate:
+            return super().validate_number(number)
+        # Точное число страниц неизвестно, дальние страницы не режем
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        if not self.is_approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # Число страниц обрезано пределом подсчета, поэтому о следующей
+        # странице говорит лишняя запись
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        more = len(rows) > self.per_page
+        page = self._get_page(rows[:self.per_page], number, self)
+        # Страница остается обычной Page, меняется только эта проверка
+        page.has_next = lambda: more
+        return page
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        num_pages = max(self.num_pages, number)
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from range(1, num_pages + 1)
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            if not self.is_approximate:
+                # Последних страниц приблизительной ленты никто не знает
+                yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+def paginator(posts, request, count_key=None, count=None,
+              count_timeout=None):
+    paginator = PostPaginator(
+        posts, settings.POSTS_PER_PAGE,
+        count_key=count_key, count_timeout=count_timeout
+    )
+    if count is not None:
+        # Число записей уже известно, например из архива по месяцам
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.elided_page_range = list(
+        paginator.get_elided_page_range(page_obj.number)
+    )
     return page_obj
+
+
+class KeysetPage:
+    """
+    Страница списка, выбранная по ключу.
+
+    ``next_after`` — id последней записи, с которого начинается
+    следующая страница, или None, если страница последняя.
+    """
+
+    def __init__(self, object_list, after, next_after):
+        self.object_list = object_list
+        self.after = after
+        self.next_after = next_after
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_after is not None
+
+
+def keyset_page(queryset, request, per_page):
+    """
+    Возвращает страницу записей по убыванию id после ``?after=``.
+
+    Выбирается на одну запись больше страницы, чтобы без подсчета
+    узнать, есть ли следующая.
+    """
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        after = None
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after)
+    rows = list(queryset.order_by('-pk')[:per_page + 1])
+    next_after = rows[per_page - 1].pk if len(rows) > per_page else None
+    return KeysetPage(rows[:per_page], after, next_after)
@@ -0,0 +1,115 @@
+"""
+Горячая и холодная части постов.
+
+Посты старше ``ARCHIVE_AFTER_DAYS`` команда ``archive_posts`` переносит
+кусками вместе с комментариями в таблицы ArchivedPost и ArchivedComment
+той же базы (шарда). Таблица Post и ее индексы остаются маленькими,
+а ленты читают только ее. Все горячие посты новее любого архивного,
+поэтому лента, дочитанная до конца горячей части, продолжается архивом
+в том же порядке. Id постов сохраняются, и ссылки на пост работают.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import post_cache
+from .bulk import iter_chunks
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .paginator import bounded_count, invalidate_counts
+from .signals import invalidate
+
+
+class HotColdFeed:
+    """
+    Лента из горячих постов, продолженная архивом.
+
+    Архив читается, только если запрошенный срез заходит за конец
+    горячей части. Поддерживает срезы и счет, поэтому подходит
+    для Paginator.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+
+    def count(self):
+        return self.hot.count() + self.cold.count()
+
+    def bounded_count(self, limit):
+        """Считает записи, но не больше ``limit + 1``."""
+        hot = bounded_count(self.hot, limit)
+        if hot > limit:
+            return hot
+        return hot + bounded_count(self.cold, limit - hot)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = item.stop
+        hot = list(self.hot[start:stop])
+        if len(hot) == stop - start:
+            return hot
+        # Горячая часть кончилась внутри среза или до него
+        hot_total = start + len(hot) if hot else self.hot.count()
+        cold = self.cold[max(start - hot_total, 0):stop - hot_total]
+        return hot + list(cold)
+
+
+def fall_through(build):
+    """
+    Собирает ленту по обеим частям.
+
+    ``build`` получает менеджер Post или ArchivedPost и возвращает
+    выборку ленты, одинаковую для обоих.
+    """
+    return HotColdFeed(build(Post.objects), build(ArchivedPost.objects))
+
+
+def cutoff(days=None):
+    """Граница архива: посты раньше нее переносятся."""
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_chunk(db, ids):
+    """Переносит кусок постов и их комментарии в архив."""
+    with transaction.atomic(using=db):
+        posts = [
+            ArchivedPost(**row)
+            for row in Post.objects.using(db).filter(pk__in=ids).values(
+                'id', 'text', 'pub_date', 'author_id', 'group_id', 'image'
+            )
+        ]
+        comments = Comment.objects.using(db).filter(post_id__in=ids)
+        ArchivedPost.objects.using(db).bulk_create(posts)
+        ArchivedComment.objects.using(db).bulk_create([
+            ArchivedComment(**row)
+            for row in comments.values(
+                'id', 'post_id', 'author_id', 'text', 'created'
+            )
+        ])
+        # Посты лишь переезжают, поэтому без сигналов: архив по месяцам
+        # и счетчики лент не меняются, кроме «Популярного» без архива
+        comments._raw_delete(db)
+        Post.objects.using(db).filter(pk__in=ids)._raw_delete(db)
+    invalidate(post_cache.invalidate, *ids)
+    invalidate(invalidate_counts, 'trending')
+    return len(posts)
+
+
+def archive_before(db, moment, chunk_size, progress=None):
+    """Переносит в архив все посты шарда, опубликованные до ``moment``."""
+    done = 0
+    old = Post.objects.using(db).filter(pub_date__lt=moment)
+    for ids in iter_chunks(old, chunk_size):
+        done += archive_chunk(db, ids)
+        if progress:
+            progress(done)
+    return done
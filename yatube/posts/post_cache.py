@@ -0,0 +1,103 @@
+"""
+Кэш страницы поста.
+
+Пост с автором и группой и первая страница комментариев хранятся
+в кэше одним объектом под ключом поста. Сбрасывается он при
+сохранении поста и его комментариев. Автор и группа общие для многих
+постов, поэтому для них хранится версия: при изменении автора или
+группы версия меняется, и устаревшие записи пересобираются при
+следующем чтении. Несуществующий id тоже кэшируется, коротко.
+Пост ищется и среди архивных.
+
+Посты удаляют и переносят и команды в других процессах, поэтому
+страница кэшируется только в общем кэше (``CACHE_IS_SHARED``).
+Без него она собирается при каждом запросе.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import ArchivedPost, Post
+
+DETAIL_KEY = 'post_detail:{}'
+AUTHOR_VERSION_KEY = 'post_detail:author:{}'
+GROUP_VERSION_KEY = 'post_detail:group:{}'
+MISSING = 'missing'
+
+
+def _version_keys(author_id, group_id):
+    keys = [AUTHOR_VERSION_KEY.format(author_id)]
+    if group_id:
+        keys.append(GROUP_VERSION_KEY.format(group_id))
+    return keys
+
+
+def _find(post_id):
+    # Пост мог уехать в архив, id у него тот же. В шарде нет таблиц
+    # пользователей и групп, тогда они подгружаются из основной базы
+    for model in (Post, ArchivedPost):
+        post = model.objects.locate(post_id).with_related(
+            'author', 'group'
+        ).filter(pk=post_id).first()
+        if post is not None:
+            return post
+    return None
+
+
+def _build(post_id):
+    post = _find(post_id)
+    if post is None:
+        return None
+    comments = post.comments.with_related('author')[
+        :settings.POST_DETAIL_COMMENTS
+    ]
+    # Выполненная выборка сохраняется в кэше вместе с результатом
+    len(comments)
+    return {'post': post, 'comments': comments}
+
+
+def get_detail(post_id):
+    """Возвращает пост с комментариями или бросает Http404."""
+    if not settings.CACHE_IS_SHARED:
+        detail = _build(post_id)
+        if detail is None:
+            raise Http404('Пост не найден')
+        return detail
+    key = DETAIL_KEY.format(post_id)
+    detail = cache.get(key)
+    if detail == MISSING:
+        raise Http404('Пост не найден')
+    if detail is not None:
+        post = detail['post']
+        versions = cache.get_many(
+            _version_keys(post.author_id, post.group_id)
+        )
+        if versions == detail['versions']:
+            return detail
+    detail = _build(post_id)
+    if detail is None:
+        cache.set(key, MISSING, settings.POST_DETAIL_MISSING_TIMEOUT)
+        raise Http404('Пост не найден')
+    post = detail['post']
+    detail['versions'] = cache.get_many(
+        _version_keys(post.author_id, post.group_id)
+    )
+    cache.set(key, detail, settings.POST_DETAIL_TIMEOUT)
+    return detail
+
+
+def invalidate(*post_ids):
+    """Сбрасывает кэш страниц постов."""
+    cache.delete_many([DETAIL_KEY.format(post_id) for post_id in post_ids])
+
+
+def bump_author(author_id):
+    """Помечает устаревшими страницы постов автора."""
+    cache.set(AUTHOR_VERSION_KEY.format(author_id), time.time_ns(), None)
+
+
+def bump_group(group_id):
+    """Помечает устаревшими страницы постов группы."""
+    cache.set(GROUP_VERSION_KEY.format(group_id), time.time_ns(), None)
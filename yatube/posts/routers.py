@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+
+from core.db.routers import mark_written
+
+from . import sharding
+
+SHARDED_MODELS = ('post', 'comment', 'archivedpost', 'archivedcomment')
+# Модели, шард которых определяется автором
+POST_MODELS = ('post', 'archivedpost')
+
+
+def _is_sharded_model(model):
+    return (model._meta.app_label == 'posts'
+            and model._meta.model_name in SHARDED_MODELS)
+
+
+def _shard_of_object(instance):
+    """Шард поста или комментария, в том числе еще не сохраненного."""
+    model = instance.__class__
+    # База несохраненного объекта могла быть угадана Django
+    # по первой присвоенной связи, например по автору
+    if instance._state.db and not instance._state.adding:
+        return instance._state.db
+    if model._meta.model_name in POST_MODELS:
+        return sharding.shard_for_author(instance.author_id)
+    post = model.post.field.get_cached_value(instance, None)
+    if post is not None and post._state.db:
+        return post._state.db
+    if instance.post_id:
+        return sharding.shard_for_post(instance.post_id)
+    return None
+
+
+class ShardRouter:
+    """
+    Маршрутизирует посты и комментарии по шардам.
+
+    Шард определяется по подсказке-экземпляру: сам пост или
+    комментарий, пост для его комментариев, автор для его постов.
+    Пользователи, группы и прочие модели, запрошенные от объекта
+    из шарда, читаются из основной базы.
+    """
+
+    def _route(self, model, hints):
+        if not sharding.is_sharded():
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if not _is_sharded_model(model):
+            if instance._state.db in sharding.extra_shards():
+                return 'default'
+            return None
+        # Через __class__, чтобы понимать и ленивый request.user
+        if _is_sharded_model(instance.__class__):
+            return _shard_of_object(instance)
+        if (isinstance(instance, get_user_model())
+                and model._meta.model_name in POST_MODELS):
+            return sharding.shard_for_author(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        db = self._route(model, hints)
+        if db is not None:
+            # Дальше по цепочке маршрутизатор реплик не вызывается
+            mark_written()
+        return db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding.is_sharded():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # В дополнительных шардах только таблицы постов и комментариев,
+        # в том числе архивных
+        if db in sharding.extra_shards():
+            return app_label == 'posts' and model_name in SHARDED_MODELS
+        return None
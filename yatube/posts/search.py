@@ -0,0 +1,88 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+На SQLite рядом с таблицей заводится внешний индекс FTS5, который
+поддерживают триггеры. Его создает обработчик ``post_migrate``: таблицу
+модели Django при некоторых миграциях пересоздает, и триггеры вместе
+со старой таблицей пропадают. Тогда индекс создается заново
+и перестраивается. На других базах поиск откатывается на ``LIKE``.
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_SUFFIX = '_fts'
+
+
+def fts_table(model):
+    return model._meta.db_table + FTS_SUFFIX
+
+
+def is_available(queryset):
+    """Есть ли для базы выборки полнотекстовый индекс."""
+    return connections[queryset.db].vendor == 'sqlite'
+
+
+def install(model, column, using='default'):
+    """Создает индекс FTS5 и триггеры, если их нет."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    table = model._meta.db_table
+    fts = fts_table(model)
+    statements = {
+        f'{fts}_ai': (
+            f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"(rowid, "{column}") '
+            f'VALUES (new.id, new."{column}"); END'
+        ),
+        f'{fts}_ad': (
+            f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, "{column}") '
+            f'VALUES (\'delete\', old.id, old."{column}"); END'
+        ),
+        f'{fts}_au': (
+            f'CREATE TRIGGER "{fts}_au" AFTER UPDATE OF "{column}" '
+            f'ON "{table}" BEGIN '
+            f'INSERT INTO "{fts}"("{fts}", rowid, "{column}") '
+            f'VALUES (\'delete\', old.id, old."{column}"); '
+            f'INSERT INTO "{fts}"(rowid, "{column}") '
+            f'VALUES (new.id, new."{column}"); END'
+        ),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = %s", [table]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in statements if name not in existing]
+        if not missing:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+            f'"{column}", content="{table}", content_rowid="id", '
+            f'tokenize="unicode61 remove_diacritics 2")'
+        )
+        for name in missing:
+            cursor.execute(statements[name])
+        # Пока триггеров не было, индекс мог разойтись с таблицей
+        cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+def build_query(term):
+    """Превращает строку поиска в запрос FTS5: все слова по префиксу."""
+    words = re.findall(r'\w+', term)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def matching(queryset, term):
+    """Отбирает записи, в тексте которых есть все слова строки поиска."""
+    query = build_query(term)
+    if not query:
+        return queryset
+    fts = fts_table(queryset.model)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [query]
+    ))
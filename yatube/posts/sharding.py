@@ -0,0 +1,147 @@
+"""
+Разнесение постов и комментариев по базам.
+
+Автор закрепляется за шардом по хэшу id или явно, после
+перебалансировки; комментарии лежат рядом со своим постом. Id постов
+выдает каталог PostLocation в основной базе, он же хранит шард поста.
+Основная база — нулевой шард, поэтому с одним шардом все работает
+как прежде.
+
+Каталог кэшируется только в общем для процессов кэше
+(``CACHE_IS_SHARED``): перебалансировка сбрасывает записи из процесса
+команды, и копии в памяти серверов продолжали бы вести в старый шард.
+Без общего кэша каждый поиск — запрос по первичному ключу.
+"""
+import heapq
+import zlib
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+
+AUTHOR_KEY = 'shard:author:{}'
+POST_KEY = 'shard:post:{}'
+
+
+def is_sharded():
+    return len(settings.POST_SHARDS) > 1
+
+
+def extra_shards():
+    """Шарды помимо основной базы."""
+    return settings.POST_SHARDS[1:]
+
+
+def hashed_shard(author_id):
+    """Шард автора по хэшу его id."""
+    shards = settings.POST_SHARDS
+    return shards[zlib.crc32(str(author_id).encode()) % len(shards)]
+
+
+def _remember(key, shard):
+    if settings.CACHE_IS_SHARED:
+        cache.set(key, shard, settings.SHARD_DIRECTORY_TIMEOUT)
+
+
+def _lookup(key, load):
+    """Шард из кэша каталога или из базы через ``load``."""
+    shard = cache.get(key) if settings.CACHE_IS_SHARED else None
+    if shard is None:
+        shard = load()
+        _remember(key, shard)
+    return shard
+
+
+def shard_for_author(author_id):
+    """Возвращает шард, в котором лежат посты автора."""
+    if not is_sharded():
+        return 'default'
+
+    def load():
+        from .models import AuthorShard
+        return AuthorShard.objects.filter(
+            author_id=author_id
+        ).values_list('shard', flat=True).first() or hashed_shard(author_id)
+
+    return _lookup(AUTHOR_KEY.format(author_id), load)
+
+
+def shard_for_post(post_id):
+    """Возвращает шард поста; посты без записи в каталоге — в основной."""
+    if not is_sharded():
+        return 'default'
+
+    def load():
+        from .models import PostLocation
+        return PostLocation.objects.filter(
+            pk=post_id
+        ).values_list('shard', flat=True).first() or 'default'
+
+    return _lookup(POST_KEY.format(post_id), load)
+
+
+def allocate_post_id(shard):
+    """Выдает глобальный id для нового поста в шарде."""
+    from .models import PostLocation
+    post_id = PostLocation.objects.create(shard=shard).pk
+    _remember(POST_KEY.format(post_id), shard)
+    return post_id
+
+
+class ShardedFeed:
+    """
+    Лента по всем шардам.
+
+    Каждый шард отдает первые ``stop`` записей в порядке выборки,
+    затем они сливаются k-way слиянием. Поддерживает срезы и count(),
+    поэтому подходит для Paginator. Вместо шардов можно передать
+    готовые части ``parts``, например куски длинного фильтра ``__in``.
+    """
+
+    def __init__(self, queryset, shards=None, parts=None):
+        self.queryset = queryset
+        self.shards = shards or settings.POST_SHARDS
+        if parts is None:
+            parts = [queryset.using(shard) for shard in self.shards]
+        self.parts = parts
+        field = (queryset.query.order_by or queryset.model._meta.ordering)[0]
+        self.reverse = field.startswith('-')
+        self.key = attrgetter(field.lstrip('-'))
+
+    def count(self):
+        return sum(part.count() for part in self.parts)
+
+    def bounded_count(self, limit):
+        """Считает записи во всех шардах, но не больше ``limit + 1``."""
+        return min(
+            sum(part[:limit + 1].count() for part in self.parts),
+            limit + 1
+        )
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        parts = [part[:item.stop] for part in self.parts]
+        merged = heapq.merge(*parts, key=self.key, reverse=self.reverse)
+        return list(islice(merged, item.start or 0, item.stop))
+
+
+def feed_in_chunks(queryset, field, values, size):
+    """
+    Лента по всем шардам с фильтром ``field__in`` по длинному списку.
+
+    Список делится на куски не длиннее ``size``, чтобы запрос уместился
+    в предел параметров SQLite; куски каждого шарда сливаются как шарды.
+    """
+    values = list(values)
+    chunks = [values[start:start + size]
+              for start in range(0, len(values), size)]
+    return ShardedFeed(queryset, parts=[
+        queryset.using(shard).filter(**{f'{field}__in': chunk})
+        for shard in settings.POST_SHARDS
+        for chunk in chunks
+    ])
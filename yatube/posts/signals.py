@@ -0,0 +1,120 @@
+from django.db import router, transaction
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save, pre_save)
+from django.dispatch import receiver
+
+from . import (archive, feeds, group_directory, post_cache, search,
+               sharding, trending)
+from .models import Comment, Group, Post, User
+from .paginator import invalidate_counts
+
+
+@receiver(pre_save, sender=Post)
+def allocate_post_id(sender, instance, using, raw, **kwargs):
+    """Выдает новому посту глобальный id, если постов несколько шардов."""
+    if instance.pk is None and not raw and sharding.is_sharded():
+        instance.pk = sharding.allocate_post_id(using)
+
+
+@receiver(pre_save, sender=Post)
+def set_initial_score(sender, instance, raw, **kwargs):
+    """Выдает новому посту начальный рейтинг популярности."""
+    # Так рейтинг получают и посты из админки, команд и ORM
+    if instance._state.adding and not raw and not instance.trend_score:
+        instance.trend_score = trending.initial_score(instance.pub_date)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Запоминает исходную группу поста, чтобы сбросить и ее."""
+    # Через __dict__, чтобы не подгружать отложенное поле запросом
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+def invalidate(func, *args):
+    """
+    Сбрасывает кэш сразу и еще раз после коммита.
+
+    Между ними параллельный запрос мог успеть положить в кэш
+    данные, прочитанные до коммита.
+    """
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+def feed_keys(instance, created):
+    """Ключи лент, в которых изменилось число постов."""
+    if not created and instance.group_id == instance._initial_group_id:
+        return []
+    groups = {instance.group_id, instance._initial_group_id} - {None}
+    keys = [f'group:{group_id}' for group_id in groups]
+    if created:
+        # Числа лент подписок не сбрасываем: у автора могут быть сотни
+        # тысяч подписчиков, а эти числа и так живут недолго
+        keys += ['all', 'trending', f'author:{instance.author_id}']
+    return keys
+
+
+def syndication_scopes(instance):
+    """Области RSS/Atom лент, в которые попадает пост."""
+    group_ids = {instance.group_id, instance._initial_group_id} - {None}
+    slugs = Group.objects.filter(
+        pk__in=group_ids
+    ).values_list('slug', flat=True)
+    return [
+        'all', f'author:{instance.author.username}',
+        *(f'group:{slug}' for slug in slugs),
+    ]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, signal, created=True, raw=False,
+                 **kwargs):
+    # У post_delete нет created: удаление меняет те же счетчики
+    if signal is post_delete:
+        archive.post_deleted(instance, instance._initial_group_id)
+    elif not raw:
+        archive.post_saved(instance, created, instance._initial_group_id)
+    invalidate(
+        group_directory.invalidate,
+        instance.group_id, instance._initial_group_id
+    )
+    invalidate(post_cache.invalidate, instance.pk)
+    keys = feed_keys(instance, created)
+    if keys:
+        invalidate(invalidate_counts, *keys)
+    invalidate(feeds.bump, *syndication_scopes(instance))
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate(post_cache.invalidate, instance.post_id)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, на странице его нет
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate(post_cache.bump_author, instance.pk)
+    invalidate(feeds.bump, 'all', f'author:{instance.username}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate(post_cache.bump_group, instance.pk)
+    invalidate(feeds.bump, f'group:{instance.slug}')
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    """Создает полнотекстовые индексы постов и комментариев."""
+    if sender.name != 'posts':
+        return
+    for model in (Post, Comment):
+        if router.allow_migrate_model(using, model):
+            search.install(model, 'text', using)
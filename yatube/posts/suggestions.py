@@ -0,0 +1,75 @@
+"""
+Рекомендации «На кого подписаться».
+
+Список считается офлайн командой ``suggest_follows`` по схеме «друзья
+друзей»: кандидат получает по очку за каждого автора из подписок
+пользователя, который сам подписан на кандидата. В запросе только
+читается готовый список.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from . import follow_graph
+from .models import Follow, FollowSuggestion, User
+
+
+def chunked(ids, size):
+    """Разбивает последовательность id на части заданного размера."""
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _load_following(user_ids, chunk_size):
+    following = defaultdict(set)
+    for chunk in chunked(user_ids, chunk_size):
+        pairs = Follow.objects.filter(
+            user_id__in=chunk, author__isnull=False
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in pairs:
+            following[user_id].add(author_id)
+    return following
+
+
+def build_suggestions(user_ids, limit, chunk_size):
+    """Считает ранжированные рекомендации для пачки пользователей."""
+    following = _load_following(user_ids, chunk_size)
+    followees = set().union(*following.values()) if following else set()
+    second = _load_following(followees, chunk_size)
+    result = {}
+    for user_id in user_ids:
+        own = following.get(user_id, set())
+        counts = Counter()
+        for followee in own:
+            counts.update(second.get(followee, set()) - own)
+        counts.pop(user_id, None)
+        result[user_id] = [
+            author_id for author_id, _ in counts.most_common(limit)
+        ]
+    return result
+
+
+def mark_stale(user_id):
+    """Помечает рекомендации пользователя к пересчету."""
+    FollowSuggestion.objects.filter(
+        user_id=user_id, is_stale=False
+    ).update(is_stale=True)
+
+
+def get_suggested_authors(user):
+    """Возвращает готовых рекомендованных авторов для пользователя."""
+    if not user.is_authenticated:
+        return []
+    row = FollowSuggestion.objects.filter(
+        user=user
+    ).values_list('authors', flat=True).first()
+    if not row:
+        return []
+    following = follow_graph.get_following(user.id)
+    ids = [
+        int(author_id) for author_id in row.split(',')
+        if not follow_graph.contains(following, int(author_id))
+    ][:settings.FOLLOW_SUGGESTIONS_SHOWN]
+    authors = User.objects.in_bulk(ids)
+    return [authors[author_id] for author_id in ids if author_id in authors]
@@ -0,0 +1,17 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+
+from .models import Post
+
+# Размер превью, как в шаблонах ленты и поста
+THUMBNAIL_GEOMETRY = '960x339'
+
+
+@task
+def warm_thumbnail(post_id):
+    """Заранее строит превью картинки поста, чтобы не делать это в ленте."""
+    post = Post.objects.locate(post_id).filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    get_thumbnail(post.image, THUMBNAIL_GEOMETRY, crop='center', upscale=True)
@@ -0,0 +1,232 @@
+from io import StringIO
+
+from django.contrib.admin import helpers
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import archive, search
+from ..models import Comment, Group, MonthlyBucket, Post
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    """Тестирует списки постов и комментариев в админке."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание администратора, группы и постов."""
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Тест'
+        )
+        cls.post = Post.objects.create(
+            author=cls.admin, group=cls.group, text='Ёжик в тумане'
+        )
+        Post.objects.create(author=cls.admin, text='Просто пост')
+        Comment.objects.create(
+            author=cls.admin, post=cls.post, text='Ёжики милые'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        cls.group.delete()
+        cls.admin.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_build_query(self):
+        """Проверка сборки запроса FTS5 из строки поиска."""
+        self.assertEqual(
+            search.build_query('ёжик "в" тумане'),
+            '"ёжик"* "в"* "тумане"*'
+        )
+        self.assertEqual(search.build_query('"*()'), '')
+
+    def test_search_uses_fts(self):
+        """Проверка поиска по индексу FTS5 с учетом правок."""
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'ЁЖИК'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+
+        self.post.text = 'Заяц в тумане'
+        self.post.save()
+        response = self.client.get(url, {'q': 'ёжик'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+        response = self.client.get(url, {'q': 'тум'})
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'ёжики'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Проверка отсутствия запроса на каждую строку списка."""
+        url = reverse('admin:posts_post_changelist')
+        # Первый запрос кладет пользователя в кэш
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Post.objects.bulk_create([
+            Post(author=self.admin, group=self.group, text=f'Пост {i}')
+            for i in range(10)
+        ])
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url)
+        self.assertEqual(len(after), len(before))
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+
+class BulkActionsTests(TestCase):
+    """Тестирует массовый перенос и удаление постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание администратора и групп."""
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.spam = Group.objects.create(
+            title='Спам', slug='spam', description='Тест'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Тест'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.spam.delete()
+        cls.group.delete()
+        cls.admin.delete()
+
+    def setUp(self):
+        """Создание постов и экземпляра клиента."""
+        cache.clear()
+        self.posts = [
+            Post.objects.create(
+                author=self.admin, group=self.spam, text=f'Спам {i}'
+            )
+            for i in range(5)
+        ]
+        self.comment = Comment.objects.create(
+            author=self.admin, post=self.posts[0], text='Комментарий'
+        )
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def group_count(self, group):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': group.slug})
+        )
+        return response.context['page_obj'].paginator.count
+
+    def test_move_action(self):
+        """Проверка переноса выбранных постов в группу."""
+        self.assertEqual(self.group_count(self.spam), 5)
+        self.client.post(self.url, {
+            'action': 'move_to_group',
+            'group': self.group.slug,
+            helpers.ACTION_CHECKBOX_NAME: [p.pk for p in self.posts[:3]],
+        })
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(), 3
+        )
+        self.assertEqual(self.group_count(self.spam), 2)
+        self.assertEqual(self.group_count(self.group), 3)
+        self.assertEqual(
+            LogEntry.objects.filter(action_flag=CHANGE).count(), 3
+        )
+        self.assertEqual(
+            MonthlyBucket.objects.get(
+                scope=archive.group_scope(self.group.pk)
+            ).count, 3
+        )
+
+    def test_delete_action_asks_confirmation(self):
+        """Проверка удаления постов после подтверждения."""
+        data = {
+            'action': 'delete_in_chunks',
+            helpers.ACTION_CHECKBOX_NAME: [p.pk for p in self.posts],
+        }
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.context['count'], 5)
+        self.assertEqual(Post.objects.count(), 5)
+
+        self.client.post(self.url, {**data, 'post': 'yes'})
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            LogEntry.objects.filter(action_flag=DELETION).count(), 5
+        )
+        self.comment.refresh_from_db()
+        self.assertIsNone(self.comment.post_id)
+        self.assertEqual(self.group_count(self.spam), 0)
+        self.assertFalse(MonthlyBucket.objects.exists())
+
+    def test_actions_require_permissions(self):
+        """Проверка, что действия доступны только с нужными правами."""
+        editor = User.objects.create_user(username='editor', is_staff=True)
+        editor.user_permissions.add(*Permission.objects.filter(
+            codename__in=('view_post', 'change_post')
+        ))
+        self.client.force_login(editor)
+        ids = [p.pk for p in self.posts]
+        self.client.post(self.url, {
+            'action': 'delete_in_chunks', 'post': 'yes',
+            helpers.ACTION_CHECKBOX_NAME: ids,
+        })
+        self.assertEqual(Post.objects.count(), 5)
+        self.client.post(self.url, {
+            'action': 'move_to_group', 'group': self.group.slug,
+            helpers.ACTION_CHECKBOX_NAME: ids,
+        })
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 5)
+
+        editor.user_permissions.remove(
+            Permission.objects.get(codename='change_post')
+        )
+        editor = User.objects.get(pk=editor.pk)
+        self.client.force_login(editor)
+        self.client.post(self.url, {
+            'action': 'move_to_group', 'group': self.spam.slug,
+            helpers.ACTION_CHECKBOX_NAME: ids,
+        })
+        self.assertFalse(Post.objects.filter(group=self.spam).exists())
+
+    def test_bulk_posts_command(self):
+        """Проверка команды переноса и удаления частями."""
+        out = StringIO()
+        call_command(
+            'bulk_posts', group='spam', to='-', chunk_size=2, stdout=out
+        )
+        self.assertIn('Перенесено постов: 5', out.getvalue())
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+        call_command(
+            'bulk_posts', author='admin', delete=True, chunk_size=2,
+            stdout=out
+        )
+        self.assertFalse(Post.objects.exists())
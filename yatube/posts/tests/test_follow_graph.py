@@ -0,0 +1,275 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import follow_graph
+from ..models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class FollowGraphTests(TransactionTestCase):
+    """
+    Тестирует индекс графа подписок.
+
+    Индекс обновляется после коммита, поэтому представления
+    выполняются в настоящих транзакциях.
+    """
+
+    def setUp(self):
+        """Создание пользователей и экземпляра клиента."""
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.author = User.objects.create_user(username='Neo')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_pack_and_contains(self):
+        """Проверка упаковки id и поиска в массиве."""
+        ids = follow_graph.pack([5, 1, 3, 5])
+        self.assertEqual(list(ids), [1, 3, 5])
+        self.assertTrue(follow_graph.contains(ids, 3))
+        self.assertFalse(follow_graph.contains(ids, 4))
+        self.assertFalse(follow_graph.contains(ids, 6))
+
+    def test_follow_views_update_index(self):
+        """Проверка обновления индекса при подписке и отписке."""
+        self.assertFalse(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+        follow_graph.get_followers(self.author.id)
+        with self.assertNumQueries(0):
+            follow_graph.get_followers(self.author.id)
+
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Neo'})
+        )
+        self.assertTrue(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+        self.assertEqual(
+            list(follow_graph.get_followers(self.author.id)),
+            [self.user.id]
+        )
+        with self.assertNumQueries(0):
+            follow_graph.is_following(self.user.id, self.author.id)
+
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Neo'})
+        )
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+        self.assertEqual(len(follow_graph.get_followers(self.author.id)), 0)
+
+    def test_stale_array_is_not_stored_over_update(self):
+        """Проверка, что массив, собранный до подписки, не читается."""
+        key = follow_graph.FOLLOWING_KEY.format(self.user.id)
+        stale_key = follow_graph.ARRAY_KEY.format(
+            key, follow_graph._get_version(key)
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        follow_graph.add_follow(self.user.id, self.author.id)
+        # Медленный запрос собрал массив до подписки и положил его позже
+        cache.set(stale_key, follow_graph.pack([]))
+        self.assertTrue(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_cache_is_not_used(self):
+        """Проверка, что без общего кэша индекс читается из базы."""
+        follow_graph.get_following(self.user.id)
+        # Подписка из другого процесса: хук этого процесса не вызывается
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+
+
+class FollowSuggestionTests(TransactionTestCase):
+    """Тестирует рекомендации авторов."""
+
+    def setUp(self):
+        """Создание пользователей, подписок и экземпляра клиента."""
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.friend = User.objects.create_user(username='Neo')
+        self.author = User.objects.create_user(username='Rick')
+        Follow.objects.create(user=self.user, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_suggestions_are_computed_offline(self):
+        """Проверка пересчета и показа рекомендаций."""
+        page = reverse('posts:follow_index')
+        response = self.authorized_client.get(page)
+        self.assertEqual(response.context['suggestions'], [])
+
+        call_command('suggest_follows', stdout=StringIO())
+        response = self.authorized_client.get(page)
+        self.assertEqual(response.context['suggestions'], [self.author])
+
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Rick'})
+        )
+        suggestion = FollowSuggestion.objects.get(user=self.user)
+        self.assertTrue(suggestion.is_stale)
+        response = self.authorized_client.get(page)
+        self.assertEqual(response.context['suggestions'], [])
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class FollowWriteTests(TransactionTestCase):
+    """Тестирует идемпотентную и массовую подписку."""
+
+    def setUp(self):
+        """Создание пользователей и экземпляра клиента."""
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(3)
+        ]
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_is_idempotent(self):
+        """Проверка, что повторная подписка не создает дубликат."""
+        url = reverse(
+            'posts:profile_follow', kwargs={'username': 'author0'}
+        )
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.authors[0])
+
+    def test_bulk_follow_and_unfollow(self):
+        """Проверка подписки и отписки на многих авторов разом."""
+        url = reverse('posts:follow_bulk')
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        follow_graph.get_following(self.user.id)
+        follow_graph.get_followers(self.authors[1].id)
+        names = [author.username for author in self.authors] + ['auth']
+        response = self.authorized_client.post(
+            url, {'action': 'follow', 'authors': names}
+        )
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        ids = [author.id for author in self.authors]
+        self.assertEqual(
+            sorted(Follow.objects.filter(
+                user=self.user
+            ).values_list('author_id', flat=True)),
+            ids
+        )
+        self.assertEqual(list(follow_graph.get_following(self.user.id)), ids)
+        self.assertEqual(
+            list(follow_graph.get_followers(self.authors[1].id)),
+            [self.user.id]
+        )
+
+        self.authorized_client.post(url, {
+            'action': 'unfollow', 'authors': ['author1', 'author2'],
+            'next': reverse('posts:index'),
+        })
+        self.assertEqual(
+            list(follow_graph.get_following(self.user.id)),
+            [self.authors[0].id]
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(FOLLOW_BULK_LIMIT=2)
+    def test_bulk_follow_over_limit_shows_error(self):
+        """Проверка сообщения об ошибке при слишком длинном списке."""
+        response = self.authorized_client.post(
+            reverse('posts:follow_bulk'),
+            {
+                'action': 'follow',
+                'authors': [author.username for author in self.authors],
+            },
+            follow=True,
+        )
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertContains(response, 'Не больше 2 авторов за раз')
+
+
+@override_settings(FOLLOW_LIST_PER_PAGE=3)
+class FollowListTests(TestCase):
+    """Тестирует списки подписчиков и подписок."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора, подписчиков и зрителя."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Neo')
+        cls.viewer = User.objects.create_user(username='auth')
+        cls.followers = [
+            User.objects.create_user(username=f'fan{i}') for i in range(7)
+        ]
+        for user in cls.followers:
+            Follow.objects.create(user=user, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.followers[0])
+        for user in cls.followers[::2]:
+            Follow.objects.create(user=user, author=cls.viewer)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.author.delete()
+        cls.viewer.delete()
+        for user in cls.followers:
+            user.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.viewer)
+
+    def test_followers_are_paged_by_key(self):
+        """Проверка обхода подписчиков по ключу от новых к старым."""
+        url = reverse('posts:profile_followers', kwargs={'username': 'Neo'})
+        self.authorized_client.get(url)
+        seen = []
+        params = {}
+        while True:
+            # Сессия, пользователь, автор, страница подписок
+            # и отметка «подписан на вас»
+            with self.assertNumQueries(5):
+                response = self.authorized_client.get(url, params)
+            page_obj = response.context['page_obj']
+            for person in response.context['people']:
+                seen.append(person)
+                self.assertEqual(
+                    person.follows_you,
+                    person in self.followers[::2]
+                )
+            if not page_obj.has_next():
+                break
+            params = {'after': page_obj.next_after}
+        self.assertEqual(seen, list(reversed(self.followers)))
+
+    def test_following_list(self):
+        """Проверка списка подписок и отметки для анонима."""
+        url = reverse('posts:profile_following', kwargs={'username': 'Neo'})
+        response = self.client.get(url)
+        people = response.context['people']
+        self.assertEqual(people, [self.followers[0]])
+        self.assertFalse(people[0].follows_you)
+        self.assertContains(
+            self.client.get(
+                reverse('posts:profile', kwargs={'username': 'Neo'})
+            ),
+            url
+        )
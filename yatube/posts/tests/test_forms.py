@@ -1,11 +1,13 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
@@ -104,6 +106,23 @@ class PostFormTests(TestCase):
         self.assertEqual(object.image, 'posts/small.gif')
         self.assertIsNotNone(object.pub_date)
 
+    @override_settings(DB_BUSY_BACKOFF=0)
+    def test_create_retry_rereads_image(self):
+        """Проверка, что повтор создания поста снова читает картинку."""
+        busy = OperationalError('database is locked')
+        with mock.patch('posts.views.enqueue', side_effect=[busy, None]):
+            response = self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Повтор', 'image': SimpleUploadedFile(
+                    'retry.gif', self.small_gif, 'image/gif'
+                )}
+            )
+        self.assertRedirects(
+            response, reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        post = Post.objects.get(text='Повтор')
+        self.assertTrue(post.image.name.startswith('posts/retry'))
+
     def test_edit(self):
         """Проверка изменения поста в БД."""
         form_data = {
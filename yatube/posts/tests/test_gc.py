@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, GC_MEDIA_GRACE=0,
+    GC_CHUNK_RATE=1000, GC_MEDIA_RATE=1000
+)
+class GarbageCollectionTests(TestCase):
+    """Тестирует сборку мусора gc_orphans."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Создание поста с замененной картинкой и комментариев."""
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif')
+        )
+        self.old_name = self.post.image.name
+        # Превью в размер оригинала: без масштабирования
+        self.old_thumbnail = get_thumbnail(
+            self.post.image, '2x1', upscale=False
+        ).name
+        self.post.image = SimpleUploadedFile(
+            'new.gif', SMALL_GIF, 'image/gif'
+        )
+        self.post.save()
+        self.comment = Comment.objects.create(
+            author=self.user, post=self.post, text='Живой'
+        )
+        deleted = Post.objects.create(author=self.user, text='Удаленный')
+        Comment.objects.create(author=self.user, post=deleted, text='Сирота')
+        deleted.delete()
+
+    def media_exists(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+    def test_dry_run_deletes_nothing(self):
+        """Проверка, что пробный запуск только показывает мусор."""
+        out = StringIO()
+        call_command('gc_orphans', dry_run=True, stdout=out)
+        self.assertIn(self.old_name, out.getvalue())
+        self.assertIn('Будет удалено файлов: 1', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertTrue(self.media_exists(self.old_name))
+
+    def test_gc_removes_orphans(self):
+        """Проверка удаления сирот и сохранения используемого."""
+        self.assertTrue(self.media_exists(self.old_thumbnail))
+        call_command('gc_orphans', chunk_size=1, stdout=StringIO())
+        self.assertEqual(list(Comment.objects.all()), [self.comment])
+        self.assertFalse(self.media_exists(self.old_name))
+        self.assertFalse(self.media_exists(self.old_thumbnail))
+        self.assertTrue(self.media_exists(self.post.image.name))
+
+    def test_gc_removes_comments_of_raw_deleted_posts(self):
+        """Проверка удаления комментариев, чей пост удален в обход ORM."""
+        gone = Post.objects.create(author=self.user, text='Сырой')
+        Comment.objects.create(author=self.user, post=gone, text='Висит')
+        # Так удаляют посты массовое удаление и перенос между шардами
+        Post.objects.filter(pk=gone.pk)._raw_delete('default')
+        call_command('gc_orphans', skip_media=True, stdout=StringIO())
+        self.assertEqual(list(Comment.objects.all()), [self.comment])
+
+    @override_settings(GC_MEDIA_GRACE=60 * 60)
+    def test_fresh_files_are_kept(self):
+        """Проверка, что свежие файлы не удаляются."""
+        call_command('gc_orphans', skip_comments=True, stdout=StringIO())
+        self.assertTrue(self.media_exists(self.old_name))
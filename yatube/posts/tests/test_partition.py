@@ -0,0 +1,117 @@
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+from ..partition import fall_through
+
+User = get_user_model()
+
+
+class ArchivalTests(TestCase):
+    """Тестирует перенос старых постов в архив и чтение лент."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора и группы."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Тест'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+
+    def setUp(self):
+        """Создание свежих и старых постов, архивация старых."""
+        cache.clear()
+        self.posts = [
+            Post.objects.create(
+                author=self.user, group=self.group, text=f'Пост {i}'
+            )
+            for i in range(15)
+        ]
+        old = timezone.now() - timedelta(days=800)
+        for days, post in enumerate(self.posts[:8]):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=old - timedelta(days=days)
+            )
+        self.old_post = self.posts[0]
+        Comment.objects.create(
+            author=self.user, post=self.old_post, text='Старый комментарий'
+        )
+        call_command('archive_posts', stdout=StringIO())
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_old_posts_are_moved(self):
+        """Проверка переноса старых постов с комментариями."""
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(ArchivedPost.objects.count(), 8)
+        self.assertFalse(Comment.objects.exists())
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_post.pk)
+
+    def test_feed_falls_through_to_archive(self):
+        """Проверка продолжения ленты архивом в порядке дат."""
+        expected = list(reversed(self.posts[8:])) + self.posts[:8]
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(first.paginator.count, 15)
+        self.assertEqual(
+            [post.pk for post in list(first) + list(second)],
+            [post.pk for post in expected]
+        )
+
+    def test_trending_counts_only_hot_posts(self):
+        """Проверка, что число постов «Популярного» без архива."""
+        url = reverse('posts:trending')
+        page_obj = self.client.get(url).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 7)
+        Post.objects.filter(pk=self.posts[8].pk).update(
+            pub_date=timezone.now() - timedelta(days=800)
+        )
+        call_command('archive_posts', stdout=StringIO())
+        # Другой адрес, чтобы не попасть в кэш страницы
+        page_obj = self.client.get(url, {'page': 1}).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 6)
+
+    def test_hot_page_does_not_read_archive(self):
+        """Проверка, что страница внутри горячей части не читает архив."""
+        feed = fall_through(lambda posts: posts.all())
+        with self.assertNumQueries(1):
+            self.assertEqual(len(feed[0:5]), 5)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(feed[5:10]), 5)
+        # За концом горячей части нужно еще ее число постов
+        with self.assertNumQueries(3):
+            self.assertEqual(len(feed[10:20]), 5)
+
+    def test_archived_post_detail(self):
+        """Проверка страницы архивного поста без формы комментария."""
+        url = reverse('posts:post_detail', kwargs={'id': self.old_post.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['post'].is_archived)
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertEqual(response.context['count'], 15)
+        self.assertNotContains(response, 'Добавить комментарий')
+
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'id': self.old_post.pk}),
+            {'text': 'Новый'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,296 @@
+import re
+from http import HTTPStatus
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db.routers import allow_replica_reads, reset
+
+from .. import partition
+from ..models import (AuthorShard, Comment, Follow, Group, Post,
+                      PostLocation)
+from ..routers import ShardRouter
+from ..sharding import ShardedFeed, feed_in_chunks, shard_for_author
+
+User = get_user_model()
+
+
+class ShardedFeedTests(TestCase):
+    """Тестирует слияние ленты из нескольких шардов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора и постов."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.using('default').create(
+                author=cls.user, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_merges_shards_in_order(self):
+        """Проверка k-way слияния и подсчета по всем шардам."""
+        # Одна и та же база дважды — как два шарда с одинаковыми данными
+        feed = ShardedFeed(Post.objects.all(), shards=['default', 'default'])
+        self.assertEqual(feed.count(), 6)
+        dates = [post.pub_date for post in feed[1:5]]
+        expected = sorted(
+            [post.pub_date for post in self.posts] * 2, reverse=True
+        )[1:5]
+        self.assertEqual(dates, expected)
+        self.assertEqual(len(feed[4:]), 2)
+
+    @override_settings(POST_SHARDS=['default'])
+    def test_feed_in_chunks(self):
+        """Проверка ленты по длинному списку id, разбитому на куски."""
+        ids = [post.pk for post in self.posts]
+        feed = feed_in_chunks(Post.objects.all(), 'pk', ids, 2)
+        self.assertEqual(len(feed.parts), 2)
+        self.assertEqual(feed.count(), 3)
+        self.assertEqual(
+            feed[0:1], [max(self.posts, key=lambda post: post.pub_date)]
+        )
+
+
+class UnshardedRoutingTests(TestCase):
+    """Тестирует выборки постов, когда шард один."""
+
+    def tearDown(self):
+        reset()
+
+    @override_settings(POST_SHARDS=['default'], DATABASE_REPLICAS=['replica'])
+    def test_reads_reach_replica_router(self):
+        """Проверка, что выборки автора и поста не закреплены за базой."""
+        allow_replica_reads(True)
+        self.assertEqual(Post.objects.for_author(1).db, 'replica')
+        self.assertEqual(Post.objects.locate(1).db, 'replica')
+
+
+@override_settings(POST_SHARDS=['default', 'shard_1'])
+class ShardDirectoryTests(TestCase):
+    """Тестирует кэширование каталога шардов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def move(self, shard):
+        # Так перебалансировка из другого процесса меняет каталог
+        AuthorShard.objects.update_or_create(
+            author_id=self.user.pk, defaults={'shard': shard}
+        )
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_cache_is_not_used(self):
+        """Проверка, что без общего кэша каталог читается из базы."""
+        self.move('default')
+        self.assertEqual(shard_for_author(self.user.pk), 'default')
+        self.move('shard_1')
+        self.assertEqual(shard_for_author(self.user.pk), 'shard_1')
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_shared_cache_is_used(self):
+        """Проверка, что в общем кэше каталог не читается повторно."""
+        self.move('default')
+        self.assertEqual(shard_for_author(self.user.pk), 'default')
+        with self.assertNumQueries(0):
+            self.assertEqual(shard_for_author(self.user.pk), 'default')
+
+
+@skipUnless(
+    len(settings.POST_SHARDS) > 1, 'запускается с YATUBE_POST_SHARDS=2'
+)
+class ShardedStorageTests(TestCase):
+    """Тестирует маршрутизацию, запись и перенос постов между шардами."""
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание авторов, закрепленных за разными шардами."""
+        super().setUpClass()
+        cls.shard = settings.POST_SHARDS[1]
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        AuthorShard.objects.create(author=cls.author, shard=cls.shard)
+        AuthorShard.objects.create(author=cls.reader, shard='default')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.author.delete()
+        cls.reader.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_router(self):
+        """Проверка выбора базы по подсказке-экземпляру."""
+        router = ShardRouter()
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(post._state.db, self.shard)
+        self.assertEqual(
+            router.db_for_read(Comment, instance=post), self.shard
+        )
+        self.assertEqual(
+            router.db_for_read(Post, instance=self.author), self.shard
+        )
+        self.assertEqual(
+            router.db_for_read(User, instance=post), 'default'
+        )
+        self.assertIsNone(router.db_for_read(Post))
+
+    def test_create_in_author_shard(self):
+        """Проверка записи поста и комментария в шард автора."""
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        post = Post.objects.using(self.shard).get(text='Новый пост')
+        self.assertFalse(
+            Post.objects.using('default').filter(pk=post.pk).exists()
+        )
+        self.assertEqual(
+            PostLocation.objects.get(pk=post.pk).shard, self.shard
+        )
+        client.post(
+            reverse('posts:add_comment', kwargs={'id': post.pk}),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(
+            Comment.objects.using(self.shard).get().post_id, post.pk
+        )
+
+    def test_post_detail_from_shard(self):
+        """Проверка страницы поста и архивного поста из шарда."""
+        group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Тест'
+        )
+        post = Post.objects.create(
+            author=self.author, group=group, text='Пост в шарде'
+        )
+        Comment.objects.using(self.shard).create(
+            author=self.reader, post=post, text='Комментарий в шарде'
+        )
+        url = reverse('posts:post_detail', kwargs={'id': post.pk})
+        response = Client().get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['post'].author, self.author)
+        self.assertEqual(response.context['post'].group, group)
+        self.assertEqual(
+            [comment.author for comment in response.context['comments']],
+            [self.reader]
+        )
+
+        partition.archive_chunk(self.shard, [post.pk])
+        response = Client().get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['post'].is_archived)
+        self.assertEqual(response.context['post'].group, group)
+        self.assertContains(response, 'Комментарий в шарде')
+
+    @override_settings(FOLLOW_GRAPH_IN_LIMIT=1)
+    def test_follow_feed_with_many_authors(self):
+        """Проверка ленты подписок длиннее предела параметров."""
+        fan = User.objects.create_user(username='fan')
+        for author in (self.author, self.reader):
+            Follow.objects.create(user=fan, author=author)
+        posts = [
+            Post.objects.create(author=author, text='Пост')
+            for author in (self.author, self.reader)
+        ]
+        client = Client()
+        client.force_login(fan)
+        with CaptureQueriesContext(connections[self.shard]) as queries:
+            response = client.get(reverse('posts:follow_index'))
+        lists = re.findall(
+            r'"author_id" IN \(([^)]*)\)',
+            ' '.join(query['sql'] for query in queries)
+        )
+        self.assertTrue(lists)
+        self.assertFalse([ids for ids in lists if ',' in ids])
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in reversed(posts)]
+        )
+
+    def rebalance(self):
+        call_command(
+            'rebalance_shards', author='reader', to=self.shard,
+            chunk_size=2, stdout=StringIO()
+        )
+
+    def create_reader_posts(self):
+        posts = [
+            Post.objects.create(author=self.reader, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        for post in posts:
+            Comment.objects.create(
+                author=self.author, post=post, text='Комментарий'
+            )
+        return posts
+
+    def test_rebalance_moves_posts_and_comments(self):
+        """Проверка переноса без брошенных комментариев в источнике."""
+        posts = self.create_reader_posts()
+        ids = sorted(post.pk for post in posts)
+        self.rebalance()
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Comment.objects.using('default').exists())
+        self.assertEqual(
+            sorted(
+                Post.objects.using(self.shard).values_list('pk', flat=True)
+            ),
+            ids
+        )
+        self.assertEqual(Comment.objects.using(self.shard).count(), 3)
+        self.assertEqual(
+            set(PostLocation.objects.filter(
+                pk__in=ids
+            ).values_list('shard', flat=True)),
+            {self.shard}
+        )
+
+    def test_rebalance_rerun_after_crash(self):
+        """Проверка повторного запуска после копирования без удаления."""
+        posts = self.create_reader_posts()
+        # Прерванный запуск успел скопировать первый пост с комментарием
+        Post.objects.using(self.shard).bulk_create(posts[:1])
+        Comment.objects.using(self.shard).create(
+            author=self.author, post_id=posts[0].pk, text='Комментарий'
+        )
+        self.rebalance()
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertEqual(Post.objects.using(self.shard).count(), 3)
+        self.assertEqual(Comment.objects.using(self.shard).count(), 3)
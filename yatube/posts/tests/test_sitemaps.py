@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(SITEMAP_ROOT=TEMP_SITEMAP_ROOT, SITE_URL='http://test')
+class SitemapCommandTests(TestCase):
+    """Тестирует сборку сайтмапов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора, группы и постов."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def build(self):
+        out = StringIO()
+        call_command('build_sitemaps', shard_size=2, stdout=out)
+        return out.getvalue()
+
+    def read(self, name):
+        with open(os.path.join(TEMP_SITEMAP_ROOT, name), 'rb') as file:
+            return gzip.decompress(file.read()).decode()
+
+    def test_shards_and_incremental_rewrite(self):
+        """Проверка разбиения по диапазонам pk и перезаписи изменений."""
+        # Файл группы, файл профиля и файлы диапазонов постов
+        files = 2 + len({post.pk // 2 for post in self.posts})
+        self.assertIn(
+            f'Файлов сайтмапа: {files}, перезаписано: {files}', self.build()
+        )
+        self.assertIn(
+            'http://test/group/slug/',
+            self.read(f'sitemap-groups-{self.group.pk // 2:05d}.xml.gz')
+        )
+        last = self.posts[2].pk
+        self.assertIn(
+            f'http://test/posts/{last}/',
+            self.read(f'sitemap-posts-{last // 2:05d}.xml.gz')
+        )
+        self.assertIn('перезаписано: 0', self.build())
+
+        # Новые пользователь и пост меняют только свои файлы
+        User.objects.create_user(username='newcomer')
+        self.assertIn('перезаписано: 1', self.build())
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertIn('перезаписано: 1', self.build())
+
+        response = self.client.get('/sitemap.xml')
+        index = b''.join(response.streaming_content).decode()
+        name = f'sitemap-posts-{post.pk // 2:05d}.xml.gz'
+        self.assertIn(f'http://test/sitemaps/{name}', index)
+        response = self.client.get(f'/sitemaps/{name}')
+        self.assertEqual(response.status_code, 200)
@@ -1,6 +1,9 @@
+import math
 import shutil
 import tempfile
+from datetime import datetime, timedelta
 from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
@@ -9,8 +12,11 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Follow, Group, Post
+from .. import archive, trending
+from ..models import Follow, Group, MonthlyBucket, Post
+from ..paginator import COUNT_KEY, PostPaginator
 
 User = get_user_model()
 
@@ -301,3 +307,452 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']), self.SECOND_PAGE
                 )
+
+    def test_elided_page_range(self):
+        """Проверка окна ссылок на страницы."""
+        paginator = PostPaginator(range(1000), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, 2, '…', 47, 48, 49, 50, 51, 52, 53, '…', 99, 100]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, '…', 99, 100]
+        )
+        self.assertEqual(
+            list(PostPaginator(range(50), 10).get_elided_page_range(3)),
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_feed_count_cached_and_invalidated(self):
+        """Проверка кэширования числа постов и сброса при записи."""
+        address = reverse('posts:profile', kwargs={'username': 'auth'})
+        key = COUNT_KEY.format(f'author:{self.user.id}')
+        self.authorized_client.get(address)
+        self.assertEqual(cache.get(key), 14)
+        post = Post.objects.create(author=self.user, text='Еще пост')
+        self.assertIsNone(cache.get(key))
+        response = self.authorized_client.get(address)
+        self.assertEqual(response.context['count'], 15)
+        post.delete()
+
+    def test_new_post_keeps_follow_counts(self):
+        """Проверка, что пост не сбрасывает числа лент подписчиков."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        client = Client()
+        client.force_login(reader)
+        client.get(reverse('posts:follow_index'))
+        key = COUNT_KEY.format(f'follow:{reader.id}')
+        self.assertEqual(cache.get(key), 14)
+        Post.objects.create(author=self.user, text='Еще пост').delete()
+        self.assertEqual(cache.get(key), 14)
+        reader.delete()
+
+    @override_settings(FEED_COUNT_LIMIT=5)
+    def test_post_detail_shows_approximate_count(self):
+        """Проверка «N+» на странице поста."""
+        post = Post.objects.filter(author=self.user).first()
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'id': post.id})
+        )
+        self.assertEqual(response.context['count'], '5+')
+
+    @override_settings(FEED_COUNT_LIMIT=5)
+    def test_approximate_count(self):
+        """Проверка оценки «N+» и доступа к дальним страницам."""
+        paginator = PostPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count_display, '5+')
+        self.assertEqual(len(paginator.page(7)), 2)
+        self.assertEqual(len(paginator.page(8)), 0)
+
+    @override_settings(FEED_COUNT_LIMIT=5, POSTS_PER_PAGE=2)
+    def test_approximate_feed_navigation(self):
+        """Проверка перехода дальше обрезанного числа страниц."""
+        total = Post.objects.count()
+        paginator = PostPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertTrue(paginator.page(3).has_next())
+        self.assertFalse(paginator.page((total + 1) // 2).has_next())
+        one_per_page = PostPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            list(one_per_page.get_elided_page_range(
+                1, on_each_side=1, on_ends=1
+            )),
+            [1, 2, PostPaginator.ELLIPSIS]
+        )
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'page': 3}
+        )
+        self.assertContains(response, 'Следующая')
+        self.assertNotContains(response, 'Последняя')
+
+
+class TrendingViewsTest(TestCase):
+    """Тестирует ленту популярных постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание экземпляров Post."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.old_post = Post.objects.create(author=cls.user, text='Старый')
+        cls.new_post = Post.objects.create(author=cls.user, text='Новый')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_comment_raises_post(self):
+        """Проверка подъема поста в популярном после комментария."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'id': self.old_post.id}),
+            data={'text': 'Комментарий'}
+        )
+        response = self.authorized_client.get(reverse('posts:trending'))
+        self.assertEqual(response.context['page_obj'][0], self.old_post)
+        self.assertTemplateUsed(response, 'posts/trending.html')
+
+    def test_new_post_gets_initial_score(self):
+        """Проверка начального рейтинга поста, созданного через ORM."""
+        before = trending.initial_score()
+        post = Post.objects.create(author=self.user, text='Из ORM')
+        post.refresh_from_db()
+        self.assertGreaterEqual(post.trend_score, before)
+        self.assertLessEqual(post.trend_score, trending.initial_score())
+
+    def test_decay_prefers_fresh_activity(self):
+        """Проверка затухания старой активности."""
+        now = trending.EPOCH + timedelta(days=100)
+        old = trending.event_score(10, now - timedelta(days=2))
+        fresh = trending.event_score(1, now)
+        self.assertGreater(fresh, old)
+        self.assertAlmostEqual(
+            trending.combine(fresh, fresh), fresh + math.log(2)
+        )
+
+        Post.objects.filter(pk=self.old_post.id).update(trend_score=0)
+        trending.bump(self.old_post.id, 'comment', when=trending.EPOCH)
+        self.old_post.refresh_from_db()
+        self.assertAlmostEqual(self.old_post.trend_score, math.log(3))
+
+
+class GroupIndexViewsTest(TestCase):
+    """Тестирует каталог групп."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание экземпляров Post и Group."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.empty_group = Group.objects.create(
+            title='Пустая группа',
+            slug='empty',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+        cls.empty_group.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_group_index_stats(self):
+        """Проверка агрегатов и их сброса при новом посте."""
+        page = reverse('posts:group_index')
+        response = self.guest_client.get(page)
+        groups = {group.slug: group for group in response.context['page_obj']}
+        self.assertEqual(groups['empty'].stats['post_count'], 0)
+        self.assertEqual(groups['slug'].stats['post_count'], 1)
+        self.assertEqual(groups['slug'].stats['last_post_id'], self.post.id)
+
+        new_post = Post.objects.create(
+            author=self.user, text='Второй пост', group=self.group
+        )
+        response = self.guest_client.get(page)
+        groups = {group.slug: group for group in response.context['page_obj']}
+        self.assertEqual(groups['slug'].stats['post_count'], 2)
+        self.assertEqual(groups['slug'].stats['last_post_id'], new_post.id)
+        self.assertEqual(
+            groups['slug'].stats['last_post_text'], 'Второй пост'
+        )
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class PostDetailCacheTest(TestCase):
+    """Тестирует кэш страницы поста."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора, группы и поста."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_detail_cached_and_invalidated(self):
+        """Проверка кэширования страницы и сброса при изменениях."""
+        address = reverse('posts:post_detail', kwargs={'id': self.post.id})
+        self.client.get(address)
+        with self.assertNumQueries(0):
+            response = self.client.get(address)
+        self.assertEqual(response.context['count'], 1)
+
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'id': self.post.id}),
+            data={'text': 'Комментарий'}
+        )
+        response = self.client.get(address)
+        self.assertEqual(len(response.context['comments']), 1)
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.client.get(address)
+        self.assertEqual(response.context['post'].group.title,
+                         'Новое название')
+
+    def test_missing_post_is_cached_404(self):
+        """Проверка кэшированного ответа для несуществующего поста."""
+        address = reverse('posts:post_detail', kwargs={'id': 10 ** 6})
+        self.assertEqual(
+            self.client.get(address).status_code, HTTPStatus.NOT_FOUND
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(address)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_cache_is_not_used(self):
+        """Проверка, что без общего кэша страница собирается заново."""
+        post = Post.objects.create(author=self.user, text='Удаляемый пост')
+        address = reverse('posts:post_detail', kwargs={'id': post.id})
+        self.assertEqual(self.client.get(address).status_code, HTTPStatus.OK)
+        # Так удаляют посты команды в других процессах, без сигналов
+        Post.objects.filter(pk=post.pk)._raw_delete('default')
+        self.assertEqual(
+            self.client.get(address).status_code, HTTPStatus.NOT_FOUND
+        )
+
+
+class ArchiveViewsTest(TestCase):
+    """Тестирует архив постов по месяцам."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание постов в разных месяцах."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Тестовое описание',
+        )
+        cls.posts = []
+        for month in (1, 1, 3):
+            moment = timezone.make_aware(datetime(2022, month, 15))
+            with mock.patch('django.utils.timezone.now', return_value=moment):
+                cls.posts.append(Post.objects.create(
+                    author=cls.user, text='Тестовый пост', group=cls.group
+                ))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+        cls.other_group.delete()
+
+    def setUp(self):
+        """Создание экземпляра клиента."""
+        cache.clear()
+
+    def bucket(self, scope, month):
+        return MonthlyBucket.objects.filter(
+            scope=scope, month=datetime(2022, month, 1).date()
+        ).values_list('count', flat=True).first()
+
+    def test_buckets_follow_post_changes(self):
+        """Проверка счетчиков при создании, переносе и удалении."""
+        group = archive.group_scope(self.group.id)
+        other = archive.group_scope(self.other_group.id)
+        self.assertEqual(self.bucket(group, 1), 2)
+        self.assertEqual(
+            self.bucket(archive.author_scope(self.user.id), 3), 1
+        )
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.bucket(group, 1), 1)
+        self.assertEqual(self.bucket(other, 1), 1)
+        post.delete()
+        self.assertIsNone(self.bucket(other, 1))
+
+    def test_first_post_of_month_race(self):
+        """Проверка первого поста месяца, добавленного параллельно."""
+        month = datetime(2022, 5, 1).date()
+        scope = archive.author_scope(self.user.id)
+        real_filter = MonthlyBucket.objects.filter
+        reads = []
+
+        def racing(*args, **kwargs):
+            reads.append(kwargs)
+            if len(reads) == 1:
+                # Другой запрос успел создать строку после нашего UPDATE
+                MonthlyBucket.objects.create(
+                    scope=scope, month=month, count=1
+                )
+                return MonthlyBucket.objects.none()
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(
+            MonthlyBucket.objects, 'filter', side_effect=racing
+        ):
+            archive.change(scope, month, 1)
+        self.assertEqual(self.bucket(scope, 5), 2)
+
+    def test_month_pages(self):
+        """Проверка страниц архива и навигации."""
+        response = self.client.get(reverse(
+            'posts:author_archive', args=('auth', 2022, 1)
+        ))
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertEqual(
+            [year for year, _ in response.context['months']], [2022]
+        )
+        response = self.client.get(reverse(
+            'posts:group_archive', args=('slug', 2022, 3)
+        ))
+        self.assertEqual(len(response.context['page_obj']), 1)
+        for args in (('slug', 2022, 2), ('slug', 2022, 13), ('slug', 0, 1),
+                     ('slug', 9999, 12), ('slug', 10000, 1)):
+            with self.subTest(args=args):
+                response = self.client.get(
+                    reverse('posts:group_archive', args=args)
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SyndicationFeedsTest(TestCase):
+    """Тестирует RSS и Atom ленты."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание автора, группы и поста."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+        cls.group.delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_render(self):
+        """Проверка всех лент."""
+        addresses = (
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', kwargs={'slug': 'slug'}),
+            reverse('posts:group_atom', kwargs={'slug': 'slug'}),
+            reverse('posts:author_rss', kwargs={'username': 'auth'}),
+            reverse('posts:author_atom', kwargs={'username': 'auth'}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('Тестовый пост', response.content.decode())
+                self.assertIn('xml', response['Content-Type'])
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_cache_is_not_used(self):
+        """Проверка, что без общего кэша лента собирается заново."""
+        address = reverse('posts:group_atom', kwargs={'slug': 'slug'})
+        self.assertFalse(self.client.get(address).has_header('ETag'))
+        # Пост из другого процесса: версия этого процесса не меняется
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Новый пост', group=self.group)
+        ])
+        self.assertIn('Новый пост', self.client.get(address).content.decode())
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_conditional_get(self):
+        """Проверка 304 без запросов к базе и новой версии после поста."""
+        address = reverse('posts:group_atom', kwargs={'slug': 'slug'})
+        etag = self.client.get(address)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            self.client.get(address)
+
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Новый пост', response.content.decode())
@@ -0,0 +1,52 @@
+"""
+Рейтинг популярных постов с экспоненциальным затуханием.
+
+Вклад события весом ``w`` в момент ``t`` к моменту ``now`` равен
+``w * exp(-k * (now - t))``. Общий множитель ``exp(-k * now)`` одинаков
+для всех постов и на порядок не влияет, поэтому храним
+``log(sum(w * exp(k * (t - EPOCH))))``. Новое событие добавляется
+через logaddexp, а переписывать рейтинги по расписанию не нужно.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Post
+
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def event_score(weight, when=None):
+    """Возвращает логарифм вклада события, приведенного к эпохе."""
+    when = when or timezone.now()
+    rate = math.log(2) / settings.TRENDING_HALF_LIFE
+    return math.log(weight) + rate * (when - EPOCH).total_seconds()
+
+
+def combine(score, event):
+    """Складывает два значения в лог-пространстве без переполнения."""
+    high, low = max(score, event), min(score, event)
+    return high + math.log1p(math.exp(low - high))
+
+
+def initial_score(when=None):
+    """Рейтинг только что опубликованного поста."""
+    return event_score(settings.TRENDING_WEIGHTS['post'], when)
+
+
+def bump(post_id, event, when=None):
+    """Учитывает в рейтинге поста событие активности."""
+    score = Value(
+        event_score(settings.TRENDING_WEIGHTS[event], when),
+        output_field=FloatField()
+    )
+    high = Greatest(F('trend_score'), score)
+    low = Least(F('trend_score'), score)
+    # logaddexp одним UPDATE, без чтения и последующей записи
+    Post.objects.locate(post_id).filter(pk=post_id).update(
+        trend_score=high + Ln(Exp(low - high) + 1)
+    )
@@ -1,16 +1,70 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name: str = 'posts'
 
 urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
+    # RSS и Atom главной страницы
+    path('rss/', feeds.cached_feed(feeds.IndexFeed), name='index_rss'),
+    path(
+        'atom/', feeds.cached_feed(feeds.IndexAtomFeed), name='index_atom'
+    ),
+    # Популярные посты
+    path('trending/', views.trending_posts, name='trending'),
+    # Каталог групп
+    path('group/', views.group_index, name='group_index'),
     # Страница группы
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    # RSS и Atom группы
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.cached_feed(feeds.GroupFeed),
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.cached_feed(feeds.GroupAtomFeed),
+        name='group_atom'
+    ),
+    # Архив группы за месяц
+    path(
+        'group/<slug:slug>/<int:year>/<int:month>/',
+        views.group_archive,
+        name='group_archive'
+    ),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
+    # RSS и Atom автора
+    path(
+        'profile/<str:username>/rss/',
+        feeds.cached_feed(feeds.AuthorFeed),
+        name='author_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.cached_feed(feeds.AuthorAtomFeed),
+        name='author_atom'
+    ),
+    # Подписчики и подписки пользователя
+    path(
+        'profile/<str:username>/followers/',
+        views.profile_followers,
+        name='profile_followers'
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.profile_following,
+        name='profile_following'
+    ),
+    # Архив автора за месяц
+    path(
+        'profile/<str:username>/<int:year>/<int:month>/',
+        views.author_archive,
+        name='author_archive'
+    ),
     # Просмотр записи
     path('posts/<int:id>/', views.post_detail, name='post_detail'),
     # Создание новой записи
@@ -21,6 +75,8 @@ urlpatterns = [
     path('posts/<int:id>/comment/', views.add_comment, name='add_comment'),
     # Просмотр постов любимых авторов
     path('follow/', views.follow_index, name='follow_index'),
+    # Подписка и отписка сразу на многих авторов
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
     # Подписка на автора
     path(
         'profile/<str:username>/follow/',
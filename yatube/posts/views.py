@@ -1,17 +1,35 @@
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import is_safe_url
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
-from .forms import CommentForm, PostForm
+from core.decorators import rate_limit, retry_on_busy
+from core.tasks import enqueue
+
+from . import (archive, follow_graph, group_directory, post_cache, sharding,
+               trending)
+from .forms import BulkFollowForm, CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .paginator import paginator
+from .paginator import (count_display, feed_count, invalidate_counts,
+                        keyset_page, paginator)
+from .partition import fall_through
+from .signals import invalidate
+from .suggestions import get_suggested_authors, mark_stale
+from .tasks import warm_thumbnail
 
 
 @cache_page(20, key_prefix='index_page')
 def index(request):
     """Главная страница."""
-    posts = Post.objects.select_related('author', 'group').all()
-    page_obj = paginator(posts, request)
+    posts = fall_through(
+        lambda posts: posts.with_related('author', 'group').feed()
+    )
+    page_obj = paginator(posts, request, count_key='all')
     text = 'Последние обновления на сайте'
     template = 'posts/index.html'
     context = {'page_obj': page_obj,
@@ -19,57 +37,184 @@ def index(request):
     return render(request, template, context)
 
 
+@cache_page(20, key_prefix='trending_page')
+def trending_posts(request):
+    """Популярные посты."""
+    posts = Post.objects.with_related(
+        'author', 'group'
+    ).order_by('-trend_score').feed()
+    # Только горячие посты: у «Популярного» нет продолжения архивом
+    page_obj = paginator(posts, request, count_key='trending')
+    text = 'Популярное'
+    template = 'posts/trending.html'
+    context = {'page_obj': page_obj,
+               'text': text}
+    return render(request, template, context)
+
+
+def group_index(request):
+    """Каталог групп."""
+    groups = Group.objects.order_by('title', 'pk')
+    page_obj = paginator(groups, request)
+    stats = group_directory.get_stats([group.pk for group in page_obj])
+    for group in page_obj:
+        group.stats = stats.get(group.pk, {})
+    template = 'posts/group_index.html'
+    context = {'page_obj': page_obj,
+               'text': 'Сообщества'}
+    return render(request, template, context)
+
+
 def group_posts(request, slug):
     """Страница со списком групп."""
     text = 'Записи сообщества'
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.select_related('group').all()
-    page_obj = paginator(posts, request)
+    posts = fall_through(
+        lambda posts: posts.filter(group=group).with_related('group').feed()
+    )
+    page_obj = paginator(posts, request, count_key=f'group:{group.id}')
     context = {
         'group': group,
         'page_obj': page_obj,
-        'text': text
+        'text': text,
+        'months': archive.get_months(archive.group_scope(group.id)),
     }
     return render(request, template, context)
 
 
+def month_archive(request, scope, build, year, month, context):
+    """Посты ленты за месяц; число постов берется из архива."""
+    if not archive.is_valid_month(year, month):
+        raise Http404('Нет такого месяца')
+    count = archive.get_count(scope, year, month)
+    if not count:
+        raise Http404('В этом месяце постов нет')
+    start, end = archive.month_range(year, month)
+    posts = fall_through(
+        lambda posts: build(posts).filter(
+            pub_date__gte=start, pub_date__lt=end
+        ).feed()
+    )
+    context.update({
+        'page_obj': paginator(posts, request, count=count),
+        'months': archive.get_months(scope),
+        'month': start,
+    })
+    return render(request, 'posts/archive.html', context)
+
+
+def group_archive(request, slug, year, month):
+    """Архив группы за месяц."""
+    group = get_object_or_404(Group, slug=slug)
+    context = {'group': group, 'text': group.title}
+    return month_archive(
+        request, archive.group_scope(group.id),
+        lambda posts: posts.filter(group=group).with_related(
+            'author', 'group'
+        ),
+        year, month, context
+    )
+
+
+def author_archive(request, username, year, month):
+    """Архив автора за месяц."""
+    author = get_object_or_404(User, username=username)
+    context = {'author': author, 'text': author.get_full_name()}
+    return month_archive(
+        request, archive.author_scope(author.id),
+        lambda posts: posts.for_author(author.id).with_related('group'),
+        year, month, context
+    )
+
+
 def profile(request, username):
     """Страница профиля."""
     author = get_object_or_404(User, username=username)
     template = 'posts/profile.html'
-    posts = author.posts.select_related('group').all()
-    count_article = posts.count()
-    page_obj = paginator(posts, request)
+    posts = fall_through(
+        lambda posts: posts.for_author(author.id).with_related('group')
+    )
+    page_obj = paginator(posts, request, count_key=f'author:{author.id}')
     following = (request.user.is_authenticated
-                 and author.following.filter(user=request.user))
+                 and follow_graph.is_following(request.user.id, author.id))
     context = {
         'author': author,
-        'count': count_article,
+        'count': page_obj.paginator.count_display,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'suggestions': get_suggested_authors(request.user),
+        'months': archive.get_months(archive.author_scope(author.id)),
     }
     return render(request, template, context)
 
 
+def _follow_list(request, username, field, title):
+    """
+    Страница подписчиков или подписок пользователя.
+
+    Страница выбирается по ключу из индексов Follow по автору
+    и по подписчику, поэтому ее стоимость не зависит от числа
+    подписок. Отметка «подписан на вас» для всей страницы —
+    один запрос.
+    """
+    author = get_object_or_404(User, username=username)
+    follows = Follow.objects.filter(**{field: author})
+    other = 'user'
+    if field == 'user':
+        # Подписки на удаленных авторов не показываем
+        other = 'author'
+        follows = follows.filter(author__isnull=False)
+    follows = follows.select_related(other)
+    page_obj = keyset_page(follows, request, settings.FOLLOW_LIST_PER_PAGE)
+    people = [getattr(follow, other) for follow in page_obj]
+    followers = set()
+    if request.user.is_authenticated and people:
+        followers = set(Follow.objects.filter(
+            author=request.user, user_id__in=[user.id for user in people]
+        ).values_list('user_id', flat=True))
+    for user in people:
+        user.follows_you = user.id in followers
+    context = {
+        'author': author,
+        'title': title,
+        'people': people,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def profile_followers(request, username):
+    """Подписчики пользователя."""
+    return _follow_list(request, username, 'author', 'Подписчики')
+
+
+def profile_following(request, username):
+    """Авторы, на которых подписан пользователь."""
+    return _follow_list(request, username, 'user', 'Подписки')
+
+
 def post_detail(request, id):
     """Отдельные записи пользователя."""
-    post = Post.objects.get(id=id)
-    author = post.author
-    comments = post.comments.all()
-    form = CommentForm()
-    cnt = author.posts.count()
+    detail = post_cache.get_detail(id)
+    post = detail['post']
+    cnt = feed_count(
+        f'author:{post.author_id}',
+        fall_through(lambda posts: posts.for_author(post.author_id))
+    )
     template = 'posts/post_detail.html'
     context = {
         'post': post,
-        'count': cnt,
-        'form': form,
-        'comments': comments,
+        'count': count_display(cnt),
+        'form': CommentForm(),
+        'comments': detail['comments'],
     }
     return render(request, template, context)
 
 
 @login_required
+@rate_limit('post', methods=('POST',))
+@retry_on_busy(methods=('POST',))
 def post_create(request):
     """Создание новой записи."""
     template = 'posts/create_post.html'
@@ -83,13 +228,16 @@ def post_create(request):
     form = form.save(commit=False)
     form.author = request.user
     form.save()
+    if form.image:
+        enqueue(warm_thumbnail, form.id, key=f'thumbnail:{form.id}')
     return redirect('posts:profile', username=request.user)
 
 
 @login_required
+@retry_on_busy(methods=('POST',))
 def post_edit(request, id):
     """Редактирование записи."""
-    post = get_object_or_404(Post, id=id)
+    post = get_object_or_404(Post.objects.locate(id), id=id)
     template = 'posts/create_post.html'
     is_edit = 'is_edit'
     form = PostForm(
@@ -106,54 +254,137 @@ def post_edit(request, id):
 
     if not form.is_valid():
         return render(request, template, context)
-    form.save()
+    post = form.save()
+    if 'image' in form.changed_data and post.image:
+        enqueue(warm_thumbnail, post.id, key=f'thumbnail:{post.id}')
     return redirect('posts:post_detail', id=post.id)
 
 
 @login_required
+@rate_limit('comment', methods=('POST',))
+@retry_on_busy(methods=('POST',))
 def add_comment(request, id):
-    post = get_object_or_404(Post, id=id)
+    post = get_object_or_404(Post.objects.locate(id), id=id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        trending.bump(post.id, 'comment')
     return redirect('posts:post_detail', id=post.id)
 
 
 @login_required
 def follow_index(request):
     text = 'Посты любимых авторов'
-    authors = request.user.follower.values_list('author')
+    authors = follow_graph.get_following(request.user.id)
     if not authors:
         text = (
             'У Вас еще нет любимых авторов.<br>'
             'Подпишитесь на кого-нибудь!'
         )
-    posts = Post.objects.filter(
-        author__in=authors
-    ).select_related('group').all()
-    page_obj = paginator(posts, request)
+    # Слишком длинный список id не влезет в параметры запроса,
+    # тогда подписки выбираем подзапросом, а из шардов, где таблицы
+    # подписок нет, — кусками списка
+    limit = settings.FOLLOW_GRAPH_IN_LIMIT
+    if len(authors) > limit and sharding.is_sharded():
+        posts = fall_through(
+            lambda posts: sharding.feed_in_chunks(
+                posts.with_related('group'), 'author_id', authors, limit
+            )
+        )
+    else:
+        if len(authors) > limit:
+            authors = request.user.follower.values_list('author')
+        posts = fall_through(
+            lambda posts: posts.filter(
+                author__in=authors
+            ).with_related('group').feed()
+        )
+    page_obj = paginator(
+        posts, request, count_key=f'follow:{request.user.id}',
+        count_timeout=settings.FOLLOW_FEED_COUNT_TIMEOUT
+    )
     template = 'posts/follow.html'
     context = {'page_obj': page_obj,
-               'text': text}
+               'text': text,
+               'suggestions': get_suggested_authors(request.user)}
     return render(request, template, context)
 
 
 @login_required
+@rate_limit('follow')
+@retry_on_busy()
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        follow = Follow.objects.get_or_create(
-            user=request.user, author=author
-        )[0]
-        follow.save()
+        # INSERT OR IGNORE: повторная подписка ничего не меняет
+        Follow.objects.bulk_create(
+            [Follow(user=request.user, author=author)],
+            ignore_conflicts=True
+        )
+        transaction.on_commit(
+            lambda: follow_graph.add_follow(request.user.id, author.id)
+        )
+        invalidate(invalidate_counts, f'follow:{request.user.id}')
+        mark_stale(request.user.id)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@rate_limit('follow')
+@retry_on_busy()
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    request.user.follower.all().filter(author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
+    transaction.on_commit(
+        lambda: follow_graph.remove_follow(request.user.id, author.id)
+    )
+    invalidate(invalidate_counts, f'follow:{request.user.id}')
+    mark_stale(request.user.id)
     return redirect('posts:profile', username=username)
+
+
+@require_POST
+@login_required
+@rate_limit('follow')
+@retry_on_busy()
+def follow_bulk(request):
+    """Подписка или отписка сразу на многих авторов."""
+    form = BulkFollowForm(request.POST)
+    if form.is_valid():
+        author_ids = list(
+            User.objects.filter(
+                username__in=form.cleaned_data['authors']
+            ).exclude(pk=request.user.id).values_list('pk', flat=True)
+        )
+        add = form.cleaned_data['action'] == 'follow'
+        if add:
+            Follow.objects.bulk_create(
+                [Follow(user=request.user, author_id=author_id)
+                 for author_id in author_ids],
+                ignore_conflicts=True
+            )
+        else:
+            Follow.objects.filter(
+                user=request.user, author_id__in=author_ids
+            ).delete()
+        transaction.on_commit(
+            lambda: follow_graph.update_follows(
+                request.user.id, author_ids, add
+            )
+        )
+        invalidate(invalidate_counts, f'follow:{request.user.id}')
+        mark_stale(request.user.id)
+    else:
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(
+        next_url, allowed_hosts={request.get_host()},
+        require_https=request.is_secure()
+    ):
+        return redirect(next_url)
+    return redirect('posts:follow_index')
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_KEY = 'auth_user:{}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Бэкенд аутентификации, достающий пользователя из кэша.
+
+    Вместе с сессиями в кэше запрос авторизованного пользователя
+    не обращается к базе. Запись сбрасывается при любом сохранении
+    пользователя (смена пароля, вход) и при выходе. Кэш используется,
+    только если он общий для всех процессов (``CACHE_IS_SHARED``):
+    иначе отключенный пользователь оставался бы в других процессах.
+    """
+
+    def get_user(self, user_id):
+        if not settings.CACHE_IS_SHARED:
+            return super().get_user(user_id)
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate(user_id):
+    """Сбрасывает закэшированного пользователя."""
+    cache.delete(USER_KEY.format(user_id))
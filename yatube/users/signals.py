@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кэше при изменении и удалении."""
+    invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def drop_cached_user_on_logout(sender, user, **kwargs):
+    """Сбрасывает пользователя в кэше при выходе."""
+    if user is not None:
+        invalidate(user.pk)
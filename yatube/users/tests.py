@@ -1,3 +1,68 @@
-# from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import USER_KEY
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHE_IS_SHARED=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class CachedAuthTests(TestCase):
+    """Тестирует сессии и пользователя из кэша."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создание пользователя."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', password='secret-42'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Прибирает за собой."""
+        super().tearDownClass()
+        cls.user.delete()
+
+    def setUp(self):
+        """Создание авторизованного клиента."""
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='auth', password='secret-42')
+
+    def test_cached_page_needs_no_queries(self):
+        """Проверка запроса авторизованного без обращений к базе."""
+        self.authorized_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_password_change_drops_cached_user(self):
+        """Проверка сброса кэша при смене пароля и выходе."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(cache.get(USER_KEY.format(self.user.id)))
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('another-42')
+        user.save()
+        self.assertIsNone(cache.get(USER_KEY.format(self.user.id)))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    @override_settings(
+        CACHE_IS_SHARED=False,
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+    )
+    def test_process_cache_is_not_used(self):
+        """Проверка, что без общего кэша пользователь читается из базы."""
+        client = Client()
+        client.login(username='auth', password='secret-42')
+        client.get(reverse('posts:index'))
+        self.assertIsNone(cache.get(USER_KEY.format(self.user.id)))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = client.get(reverse('posts:index'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
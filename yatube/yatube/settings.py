@@ -60,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
@@ -70,12 +71,28 @@ INTERNAL_IPS = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Отступы убираются один раз при компиляции шаблона, вне отладки
+# готовые шаблоны кэшируются
+TEMPLATE_LOADERS = [
+    ('core.template.loaders.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Шаблоны приложений находит app_directories.Loader внутри нашего,
+# проверке debug_toolbar нужен именно APP_DIRS
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -93,13 +110,93 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# PRAGMA, применяемые при каждом подключении к SQLite.
+# auto_vacuum действует только на новой базе, для существующей
+# нужен `manage.py sqlite_maintenance --convert-vacuum`
+SQLITE_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'timeout': 5,
+            'pragmas': SQLITE_PRAGMAS,
+        },
+    }
+}
+
+# Реплики для чтения: YATUBE_DB_REPLICAS задает их число.
+# Локально копии основной базы обновляет `manage.py sync_replicas`
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('YATUBE_DB_REPLICAS', 0)) + 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+# Шарды постов и комментариев: YATUBE_POST_SHARDS задает их общее
+# число, нулевой шард — основная база. Новые шарды создаются
+# `manage.py migrate --database shard_N`
+POST_SHARDS = ['default']
+for number in range(1, int(os.environ.get('YATUBE_POST_SHARDS', 1))):
+    DATABASES[f'shard_{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.shard{number}.sqlite3'),
+    }
+    POST_SHARDS.append(f'shard_{number}')
+# Время жизни в кэше записей каталога шардов, сек; кэшируются
+# только в общем кэше (CACHE_IS_SHARED)
+SHARD_DIRECTORY_TIMEOUT = 60 * 60 * 24
+
+DATABASE_ROUTERS = [
+    'posts.routers.ShardRouter',
+    'core.db.routers.ReplicaRouter',
+]
+
+# Представления, читающие с реплик, и приложения, чьи модели туда идут
+REPLICA_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+REPLICA_APPS = ('posts', 'auth')
+# Сколько секунд после записи читать только с основной базы
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'db_primary'
+
+# Повторы пишущих запросов при занятой базе: число попыток
+# и начальная пауза, сек
+DB_BUSY_RETRIES = 5
+DB_BUSY_BACKOFF = 0.05
+# Лимиты пишущих запросов: (число запросов, длина окна в секундах)
+# для пользователя и IP-адреса; общие для процессов только
+# с общим кэшем (CACHE_IS_SHARED)
+RATE_LIMITS = {
+    'post': {'user': (10, 60), 'ip': (50, 60)},
+    'comment': {'user': (30, 60), 'ip': (150, 60)},
+    'follow': {'user': (60, 60), 'ip': (300, 60)},
 }
 
+# Фоновая очередь: число потоков воркера, попыток на задачу,
+# начальная пауза перед повтором и аренда взятой задачи, сек
+TASK_WORKERS = 4
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BACKOFF = 30
+TASK_LEASE = 60 * 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -141,15 +238,90 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic добавляет к именам хэш содержимого и кладет рядом .gz
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Заголовки кэширования статики с хэшем в имени и без него
+STATIC_IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+STATIC_REVALIDATE_CACHE = 'public, max-age=300'
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма копятся в базе и уходят командой send_outbox
+# через настоящий бэкенд OUTBOX_TRANSPORT
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+OUTBOX_TRANSPORT = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Писем за одно соединение, писем в секунду, попыток на письмо
+# и начальная пауза перед повтором, сек
+OUTBOX_BATCH = 100
+OUTBOX_RATE = 10
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF = 60
+# На сколько секунд отправитель забирает письмо себе; письма упавшего
+# отправителя возвращаются в очередь по ее истечении
+OUTBOX_LEASE = 60 * 10
 
 # Число отображаемых постов
 POSTS_PER_PAGE = 10
+# До скольки считать записи ленты и сколько хранить число в кэше, сек
+FEED_COUNT_LIMIT = 10000
+FEED_COUNT_TIMEOUT = 60 * 60
+# Ленту подписок меняет пост любого из авторов, поэтому ее число
+# не сбрасывается у всех подписчиков, а живет недолго, сек
+FOLLOW_FEED_COUNT_TIMEOUT = 60
+# Страница поста в кэше: сколько комментариев показывать, время жизни
+# записи и кэшированного ответа «не найдено», сек
+POST_DETAIL_COMMENTS = 50
+POST_DETAIL_TIMEOUT = 60 * 60
+POST_DETAIL_MISSING_TIMEOUT = 60
+# RSS/Atom: число постов в ленте и время жизни готового документа, сек;
+# документ кэшируется только в общем кэше (CACHE_IS_SHARED)
+FEED_ITEMS = 20
+FEED_DOCUMENT_TIMEOUT = 60 * 60 * 24
+# Сколько постов за раз переносят и удаляют массовые действия
+BULK_CHUNK_SIZE = 500
+# Посты старше стольких дней archive_posts переносит в архив
+ARCHIVE_AFTER_DAYS = 365
+# Сборка мусора gc_orphans: кусков комментариев и файлов в секунду,
+# и сколько секунд не трогать свежезагруженные картинки
+GC_CHUNK_RATE = 5
+GC_MEDIA_RATE = 50
+GC_MEDIA_GRACE = 60 * 60
+
+# Адрес сайта для абсолютных ссылок в сайтмапах
+SITE_URL = os.environ.get('YATUBE_SITE_URL', 'http://localhost:8000')
+# Сайтмапы пишет команда build_sitemaps, отдаются они как статика
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_URL = '/sitemaps/'
+SITEMAP_SHARD_SIZE = 50000
+
+# Время жизни индекса подписок в кэше, сек; кэшируется только
+# в общем кэше (CACHE_IS_SHARED)
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+# Больше стольких авторов ленту подписок выбираем подзапросом
+FOLLOW_GRAPH_IN_LIMIT = 500
+# Сколько авторов можно подписать или отписать одним запросом
+FOLLOW_BULK_LIMIT = 100
+# Сколько подписчиков или подписок показывать на странице
+FOLLOW_LIST_PER_PAGE = 50
+
+# Сколько рекомендованных авторов хранить и сколько показывать
+FOLLOW_SUGGESTIONS_STORED = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+
+# Период полураспада рейтинга популярности, сек, и веса событий
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_WEIGHTS = {
+    'post': 1,
+    'comment': 2,
+}
+
+# Время жизни агрегатов каталога групп, сек, и длина превью поста
+GROUP_STATS_TIMEOUT = 60 * 60
+GROUP_PREVIEW_LENGTH = 200
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -161,3 +333,24 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# Общий для всех процессов кэш — memcached по адресу YATUBE_MEMCACHED
+# (нужен пакет python-memcached). Без него у каждого процесса свой
+# кэш в памяти, и то, что не должно расходиться между процессами,
+# в нем не держим
+CACHE_IS_SHARED = bool(os.environ.get('YATUBE_MEMCACHED'))
+if CACHE_IS_SHARED:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['YATUBE_MEMCACHED'],
+    }
+
+# С общим кэшем сессии и пользователь запроса читаются из него,
+# в базу сессия пишется только при изменении. С кэшем процесса
+# выход или смена пароля сбросили бы копию лишь в одном процессе
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if CACHE_IS_SHARED
+    else 'django.contrib.sessions.backends.db'
+)
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+# Время жизни пользователя в кэше, сек
+USER_CACHE_TIMEOUT = 60 * 15
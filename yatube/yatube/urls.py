@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import serve_sitemap, serve_static
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -9,6 +11,17 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+        serve_static
+    ),
+    re_path(r'^(?P<path>sitemap\.xml)$', serve_sitemap),
+    re_path(
+        r'^{}(?P<path>sitemap-[a-z]+-\d+\.xml\.gz)$'.format(
+            settings.SITEMAP_URL.lstrip('/')
+        ),
+        serve_sitemap
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'